@@ -5,19 +5,22 @@ import shutil
 
 from pydotdict import DotDict
 
-from tools.utils import load_json, save_json
+from tools.utils import load_json, save_json, file_hash
 from tools.mongodb_client import MongoDBClient
+from tools.process_helper import BrokerSupervisor
 
 CONFIG_DIR = os.environ['CONFIG_DIR']
 CONFIG_PATH = os.path.join(CONFIG_DIR, 'config.json')
 INVOICE_APP_PATH = os.environ['INVOICE_APP_PATH']
 BASE_DATA_PATH = os.path.join(INVOICE_APP_PATH, 'data')
+MANIFEST_PATH = os.path.join(CONFIG_DIR, '.data_manifest.json')
 
 class AppContext():
     """ Application context class """
     def __init__(self):
         self.mongodb_client = MongoDBClient()
         self.config = self.load_config()
+        self.broker = BrokerSupervisor(self.config.mongodb_endpoint)
 
     def load_config(self) -> DotDict:
         """ Load configuration from file """
@@ -29,32 +32,69 @@ class AppContext():
 
     @staticmethod
     def generate_user_data():
-        """ Generate config folder if not exist """
+        """
+        Generate config folder if not exist and bring it up to date with shipped data.
+
+        A manifest of source mtimes, sizes and hashes is kept in CONFIG_DIR so unchanged
+        source files are skipped without being read. Changed json files only get keys
+        missing in the user copy merged in, user copies already having all keys are not rewritten.
+        """
         assert os.path.isdir(BASE_DATA_PATH), f"Source path does not exist: {BASE_DATA_PATH}"
 
         if not os.path.isdir(CONFIG_DIR):
             os.makedirs(CONFIG_DIR)
 
-        for entry in os.listdir(BASE_DATA_PATH):
-            src_path = os.path.join(BASE_DATA_PATH, entry)
-            dest_path = os.path.join(CONFIG_DIR, entry)
+        manifest = AppContext._load_manifest()
+        new_manifest = {}
+
+        with os.scandir(BASE_DATA_PATH) as entries:
+            for entry in entries:
+                src_path = entry.path
+                dest_path = os.path.join(CONFIG_DIR, entry.name)
+
+                # Folder: copy entire folder if it does not exist in destination
+                if entry.is_dir():
+                    if not os.path.exists(dest_path):
+                        shutil.copytree(src_path, dest_path)
+                    continue
+
+                stat = entry.stat()
+                signature = [stat.st_mtime_ns, stat.st_size]
+                record = manifest.get(entry.name, {})
 
-            # Folder: copy entire folder if it does not exist in destination
-            if os.path.isdir(src_path):
-                if not os.path.exists(dest_path):
-                    shutil.copytree(src_path, dest_path)
-            else:
                 # File: copy file if it does not exist in destination
                 if not os.path.exists(dest_path):
                     shutil.copy2(src_path, dest_path)
+                    record = {'signature': signature, 'hash': file_hash(src_path)}
+
+                elif record.get('signature') != signature:
+                    # Timestamp or size changed, only real content changes need merge work
+                    digest = file_hash(src_path)
+                    if digest != record.get('hash') and entry.name.endswith('.json'):
+                        AppContext._merge_json(src_path, dest_path)
+                    record = {'signature': signature, 'hash': digest}
 
-                else:
-                    # Content: merge content if it's a json file
-                    if entry.endswith('.json'):
-                        src_data = load_json(src_path)
-                        dest_data = load_json(dest_path)
+                new_manifest[entry.name] = record
+
+        if new_manifest != manifest:
+            save_json(new_manifest, MANIFEST_PATH)
+
+    @staticmethod
+    def _load_manifest() -> dict:
+        """ Load manifest of generated user data, empty if missing or unreadable """
+        if not os.path.isfile(MANIFEST_PATH):
+            return {}
+        try:
+            return load_json(MANIFEST_PATH).to_dict()
+        except ValueError:
+            return {}
+
+    @staticmethod
+    def _merge_json(src_path: str, dest_path: str) -> None:
+        """ Add keys of source json missing in destination json, keep destination values """
+        src_data = load_json(src_path).to_dict()
+        dest_data = load_json(dest_path).to_dict()
 
-                        # If keys are different, merge and save
-                        if src_data.keys() != dest_data.keys():
-                            merged_data = {**src_data, **dest_data}
-                            save_json(merged_data, dest_path)
+        if src_data.keys() - dest_data.keys():
+            merged_data = {**src_data, **dest_data}
+            save_json(merged_data, dest_path)
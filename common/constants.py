@@ -9,6 +9,8 @@ class RegexPatterns(Enum): # pylint:disable=R0903
 
     ONLY_LETTERS = rf"^[{VIETNAMESE}\s]*$"
     ONLY_DIGITS = r"^[0-9\s]*$"
+    INTEGER = r"^[0-9]+$"
+    POSITIVE_INTEGER = r"^0*[1-9][0-9]*$"
     LETTERS_AND_DIGITS = rf"^[{VIETNAMESE}0-9\s]*$"
     LETTERS_DIGITS_SPECIAL = rf"^[{VIETNAMESE}0-9,\.\-_\/\s]*$"
     PHONE_NUMBER = r"^0\d{9}$"
@@ -21,6 +23,8 @@ class ErrorMessage(Enum):
     INVALID_SPECIAL_CHAR = "Không được chứa ký tự đặc biệt không hợp lệ."
     EMPTY_INPUT = "Vui lòng nhập thông tin vào trường bên trên."
     INVALID_PHONE = "Số điện thoại không hợp lệ"
+    EMPTY_VALUE = "Trường này không được để trống."
+    POSITIVE_INTEGER = "Trường này phải là số nguyên lớn hơn 0."
 
 class TableAttribute(Enum): # pylint:disable=R0903
     """ Table Attribute class """
@@ -40,6 +44,11 @@ class InputMode(Enum):
     ADD = auto()
     EDIT = auto()
 
+class WidgetState(Enum):
+    """ Widget validation state, selected in style sheet by the `state` property """
+    NORMAL = ""
+    ERROR = "error"
+
 class MongoDBStatus(Enum):
     """ MongoDB Status class """
     UNKNOWN = "Chưa xác định"
@@ -47,6 +56,46 @@ class MongoDBStatus(Enum):
     CONNECTED = "Đã kết nối"
     DISCONNECTED = "Đã ngắt kết nối"
 
+class StartupStage(Enum):
+    """ Startup Stage class, value is (progress percent, description) """
+    BROKER_SPAWN = (15, "Đã khởi động MongoDB")
+    PORT_OPEN = (40, "Cổng kết nối MongoDB đã mở")
+    PING_OK = (65, "MongoDB đã phản hồi")
+    INDEXES_READY = (85, "Cơ sở dữ liệu đã sẵn sàng")
+    SUGGESTIONS_LOADED = (100, "Đã tải dữ liệu gợi ý")
+
+    @property
+    def percent(self) -> int:
+        """ Progress percent reached after this stage """
+        return self.value[0]
+
+    @property
+    def description(self) -> str:
+        """ Text shown to user after this stage """
+        return self.value[1]
+
+class ExportStage(Enum):
+    """ Invoice Export Stage class, value is (progress percent when the stage starts, description) """
+    LAYOUT = (0, "Đang tạo hóa đơn")
+    SAVE = (30, "Đang lưu tệp Excel")
+    CONVERT = (50, "Đang chuyển sang PDF")
+    RENDER = (30, "Đang tạo tệp PDF")
+
+    @property
+    def percent(self) -> int:
+        """ Progress percent shown while this stage runs """
+        return self.value[0]
+
+    @property
+    def description(self) -> str:
+        """ Text shown to user while this stage runs """
+        return self.value[1]
+
+class InvoiceRenderer(Enum):
+    """ Invoice Renderer class, value is the `invoice_renderer` config value """
+    XLSX = "xlsx"
+    PDF = "pdf"
+
 class CustomerAttribute(Enum):
     """ Customer Attribute class """
     NAME = "Tên khách hàng"
@@ -68,6 +117,13 @@ class DBCollection(Enum):
     INVOICE = auto()
     CUSTOMER = auto()
     PRODUCT = auto()
+    METADATA = auto()
+
+class WriteStatus(Enum):
+    """ Database write result class """
+    INSERTED = auto()
+    UPDATED = auto()
+    FAILED = auto()
 
 class TabAttribute(Enum):
     """ Tab Attribute class """
@@ -75,3 +131,20 @@ class TabAttribute(Enum):
     REVENEUE_STATISTICS = "Thống kê doanh thu"
     ANALYTICS_CUSTOMER = "Phân tích khách hàng"
     PRODUCT_MANAGEMENT = "Quản lý sản phẩm"
+
+class AppIcon(Enum):
+    """ Application icons, value is (qtawesome name, color) """
+    APP = ('ph.table', 'green')
+    SALES_TAB = ('ri.shopping-cart-line', '#132440')
+    ADD = ('fa5s.plus-circle', 'white')
+    EDIT = ('fa5s.edit', 'white')
+    ERASE = ('fa5s.eraser', 'white')
+    IMPORT = ('fa5s.file-import', 'white')
+    EXPORT = ('fa5s.file-export', 'white')
+    EXPAND = ('mdi.expand-all', None)
+    COLLAPSE = ('mdi.collapse-all', None)
+    BROOM = ('mdi6.broom', 'white')
+    QUESTION = ('fa5.question-circle', '#325eb6')
+    INFO = ('fa6s.circle-info', '#325eb6')
+    WARNING = ('ph.warning-octagon', '#ffa500')
+    ERROR = ('msc.error', '#cc3300')
@@ -1,14 +1,13 @@
 """ Custom Widget module """
 
 
-import re
+from typing import Callable
 
-import qtawesome as qta
 from pydotdict import DotDict
-from PyQt5.QtCore import Qt, QSize, QRect
+from PyQt5.QtCore import Qt, QSize, QRect, QObject, QTimer
 from PyQt5.QtWidgets import (
     QLineEdit,
-    QTableWidget,
+    QTableView,
     QMenu,
     QVBoxLayout,
     QHBoxLayout,
@@ -21,9 +20,14 @@ from PyQt5.QtWidgets import (
     QStyle
 )
 
-from tools.utils import clear_format_money
+from tools.utils import clear_format_money, format_money
 from common.styling import Style
-from common.constants import ErrorMessage, TableAttribute, MessageBoxType
+from common.constants import ErrorMessage, MessageBoxType, WidgetState, AppIcon
+from common.icons import get_pixmap
+from common.validation import FieldRule, FieldError
+
+# Keystroke validation waits for typing to pause this long
+VALIDATION_DELAY_MS = 150
 
 
 class MessageBoxWidget(QMessageBox, Style):
@@ -39,16 +43,16 @@ class MessageBoxWidget(QMessageBox, Style):
         if box_type == MessageBoxType.QUESTION:
             self.button_accept = QPushButton('Có')
             self.button_reject = QPushButton('Không')
-            box_icon = qta.icon('fa5.question-circle', color='#325eb6').pixmap(64, 64)
+            box_icon = get_pixmap(AppIcon.QUESTION)
         elif box_type == MessageBoxType.INFO:
             self.button_accept = QPushButton('Đồng ý')
-            box_icon = qta.icon('fa6s.circle-info', color='#325eb6').pixmap(64, 64)
+            box_icon = get_pixmap(AppIcon.INFO)
         elif box_type == MessageBoxType.WARNING:
             self.button_accept = QPushButton('Đồng ý')
-            box_icon = qta.icon('ph.warning-octagon', color='#ffa500').pixmap(64, 64)
+            box_icon = get_pixmap(AppIcon.WARNING)
         elif box_type == MessageBoxType.ERROR:
             self.button_accept = QPushButton('Đồng ý')
-            box_icon = qta.icon('msc.error', color='#cc3300').pixmap(64, 64)
+            box_icon = get_pixmap(AppIcon.ERROR)
         else:
             return
 
@@ -97,7 +101,7 @@ class QMoneyLineEdit(QLineEdit):
             return
 
         value = int(cleaned)
-        formatted = f"{value:,}".replace(",", ".") + self.prefix
+        formatted = format_money(value) + self.prefix
 
         # Block signal to prevent recursion
         self.blockSignals(True)
@@ -119,9 +123,9 @@ class QMoneyLineEdit(QLineEdit):
         return self.get_value()
 
 
-class QCustomTableWidget(QTableWidget):
+class QCustomTableWidget(QTableView):
     """
-    A QTableWidget that adds right-click context menu support.
+    A QTableView that adds right-click context menu support.
 
     Expected parent methods:
     - highlight_edit_row(row, column)
@@ -148,14 +152,14 @@ class QCustomTableWidget(QTableWidget):
         """
         super().mousePressEvent(event)
         if event.button() == Qt.RightButton:
-            item = self.itemAt(event.pos())
+            index = self.indexAt(event.pos())
 
             # Ignore if right-click is outside valid cell
-            if item is None:
+            if not index.isValid():
                 return
 
-            row = item.row()
-            col = item.column()
+            row = index.row()
+            col = index.column()
 
             # Notify parent to highlight
             if hasattr(self.parent_view, "highlight_edit_row"):
@@ -178,68 +182,88 @@ class QCustomTableWidget(QTableWidget):
 
 class VerifyInputWidget(Style):
     """ Verify Input Widget class """
-    def verify_input_logic(self, widget_dict: DotDict, data: str):
+    def show_input_error(self, input_widget: QLineEdit, error_widget: QLabel, error_msg: str):
+        """ Put input and error label in error state, untouched if they already show this error """
+        if error_widget.text() != error_msg:
+            error_widget.setText(error_msg)
+        self.set_state(input_widget, WidgetState.ERROR)
+        self.set_state(error_widget, WidgetState.ERROR)
+
+    def clear_input_error(self, input_widget: QLineEdit, error_widget: QLabel):
+        """ Put input and error label back in normal state """
+        self.set_state(input_widget, WidgetState.NORMAL)
+        self.set_state(error_widget, WidgetState.NORMAL)
+
+    def show_validation(self, fields: DotDict, errors: list[FieldError]) -> bool:
         """
-        Validates the input data and updates the UI state of associated widgets.
-
-        This method checks the provided data against a specific regex pattern. 
-        It dynamically updates the stylesheet object names (UI state) for both 
-        the input widget and the error label based on whether the validation 
-        passes, fails, or receives empty input.
-
-        Args:
-            widget_dict (DotDict): A dictionary-like object containing:
-                - input_widget: The UI element for data entry.
-                - error_widget: The UI label for displaying error messages.
-                - pattern: A dynamic object containing the regex string in its `.value` attribute.
-                - error_msg: A dynamic object containing the error string in its `.value` attribute.
-                - title: The label text used to determine the specific input styling.
-            data (str): The raw string input to be validated.
-
-        Returns:
-            bool: True if the input matches the pattern and is not empty; False otherwise.
-
-        Note:
-            This method relies on `self.set_style()` to apply CSS-like changes 
-            immediately after updating the `objectName` of the widgets.
+        Show the result of a schema validation on the form fields.
+
+        `fields` maps each schema key to its widget dict holding a `validator`. Fields
+        without an error are cleared, returns True when there are no errors.
         """
-        status = False
-        input_widget = widget_dict.input_widget
-        error_widget = widget_dict.error_widget
-        pattern = widget_dict.pattern.value
-        error_msg = widget_dict.error_msg.value
-
-        if not data:
-            # data field is empty
-            error_widget.setText(ErrorMessage.EMPTY_INPUT.value)
-            input_widget.setObjectName('error_input')
-            error_widget.setObjectName('visible_error_label')
-            self.set_style(input_widget)
-            self.set_style(error_widget)
+        field_errors = {error.key: error.error for error in errors}
+        for key, item in fields.items():
+            item.validator.show(field_errors.get(key))
+        return not errors
 
+
+class FieldValidator(QObject):
+    """
+    Keystroke validation of one input field against its schema rule.
+
+    The check runs VALIDATION_DELAY_MS after the last keystroke, and the input and error
+    widgets are only touched when the shown error changes. An empty field shows no error
+    while typing, required fields are reported empty by form validation.
+    """
+    def __init__(
+            self,
+            owner: VerifyInputWidget,
+            input_widget: QLineEdit,
+            error_widget: QLabel,
+            rule: FieldRule,
+            clean: Callable[[str], str] = None
+        ):
+        super().__init__(input_widget)
+        self.owner = owner
+        self.input_widget = input_widget
+        self.error_widget = error_widget
+        self.rule = rule
+        self.clean = clean
+        self.error: ErrorMessage = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(VALIDATION_DELAY_MS)
+        self._timer.timeout.connect(self.validate_input)
+        input_widget.textChanged.connect(self.schedule)
+
+    def schedule(self, _text: str = None) -> None:
+        """ Validate once typing pauses """
+        self._timer.start()
+
+    def validate_input(self) -> None:
+        """ Check current text, an empty field is not an error while typing """
+        text = self.input_widget.text()
+        if self.clean is not None:
+            text = self.clean(text)
+        error = self.rule.check(text)
+        self.show(None if error == ErrorMessage.EMPTY_VALUE else error)
+
+    def show(self, error: ErrorMessage = None) -> None:
+        """ Show error, None clears it; nothing is restyled when it is already shown """
+        self._timer.stop()
+        if error == self.error:
+            return
+        self.error = error
+        if error is None:
+            self.owner.clear_input_error(self.input_widget, self.error_widget)
+        elif error == ErrorMessage.EMPTY_VALUE:
+            self.owner.show_input_error(self.input_widget, self.error_widget, ErrorMessage.EMPTY_INPUT.value)
         else:
-            if re.fullmatch(pattern, data.lower()):
-                # data is valid
-                if widget_dict.title.replace(':', '') in TableAttribute.list():
-                    self.set_style(input_widget)
-                else:
-                    input_widget.setObjectName('customer_input')
-                    self.set_style(input_widget)
-                error_widget.setObjectName('invisible_error_label')
-                self.set_style(error_widget)
-                status = True
-
-            else:
-                error_widget.setText(error_msg)
-                input_widget.setObjectName('error_input')
-                error_widget.setObjectName('visible_error_label')
-                self.set_style(error_widget)
-                self.set_style(input_widget)
-
-        return status
-
-
-class InputFieldLayout(QVBoxLayout, Style):
+            self.owner.show_input_error(self.input_widget, self.error_widget, error.value)
+
+
+class InputFieldLayout(QVBoxLayout, VerifyInputWidget):
     """ Input Field Layout class """
     def __init__(self, input_dict: DotDict):
         super().__init__()
@@ -255,23 +279,26 @@ class InputFieldLayout(QVBoxLayout, Style):
         self.input_widget:QLineEdit = input_dict.input_cls()
         self.input_widget.setFixedSize(input_w, input_h)
         self.set_style(self.input_widget)
-        self._connect_text_entered(
-            input_dict.input_cls,
-            input_dict.is_title,
-            input_dict.pattern.value,
-            input_dict.error_msg.value
-        )
-
+        self._connect_text_entered(input_dict.is_title)
         self.error_widget = QLabel()
-        self.error_widget.setObjectName('invisible_error_label')
+        self.error_widget.setObjectName('error_label')
         self.error_widget.setFixedSize(error_w, error_h)
         self.set_style(self.error_widget)
 
+        self.validator = FieldValidator(
+            self,
+            self.input_widget,
+            self.error_widget,
+            input_dict.rule,
+            clean=clear_format_money if input_dict.input_cls == QMoneyLineEdit else None
+        )
+
         self.__init_ui()
 
         input_dict.update({
             'input_widget': self.input_widget,
-            'error_widget': self.error_widget
+            'error_widget': self.error_widget,
+            'validator': self.validator
         })
 
     def __init_ui(self):
@@ -286,41 +313,22 @@ class InputFieldLayout(QVBoxLayout, Style):
         self.addLayout(input_layout)
         self.addLayout(error_layout)
 
-    def _connect_text_entered(self, widget_cls, is_title:bool, pattern: str, error_msg: str):
-        """Connect textChanged to an uppercase function with recursion guard."""
+    def _connect_text_entered(self, is_title: bool):
+        """Connect textChanged to a title case function with recursion guard, validation is done by FieldValidator."""
         def on_text_changed(text):
-            # ---- 1. Title Case formatting ----
-            if is_title:
-                if not text:
-                    return
-                formatted = text.title()
-                if formatted != text:
-                    cursor_pos = self.input_widget.cursorPosition()
-                    self.input_widget.blockSignals(True)
-                    self.input_widget.setText(formatted)
-                    self.input_widget.setCursorPosition(cursor_pos)
-                    self.input_widget.blockSignals(False)
-
-            # ---- 2. Regex validation ----
-            if widget_cls == QMoneyLineEdit:
-                text = clear_format_money(text)
-            if re.fullmatch(pattern, text.lower()) or not text:
-                # Valid or empty → hide error
-                self.input_widget.setObjectName('')
-                self.error_widget.setObjectName('invisible_error_label')
-                self.set_style(self.error_widget)
-                self.set_style(self.input_widget)
-            else:
-                # Invalid → show error
-                self.error_widget.setText(error_msg)
-                self.input_widget.setObjectName('error_input')
-                self.error_widget.setObjectName('visible_error_label')
-                self.set_style(self.input_widget)
-                self.set_style(self.error_widget)
+            if not is_title or not text:
+                return
+            formatted = text.title()
+            if formatted != text:
+                cursor_pos = self.input_widget.cursorPosition()
+                self.input_widget.blockSignals(True)
+                self.input_widget.setText(formatted)
+                self.input_widget.setCursorPosition(cursor_pos)
+                self.input_widget.blockSignals(False)
 
         self.input_widget.textChanged.connect(on_text_changed)
 
-class CustomerInputFieldLayout(QHBoxLayout, Style):
+class CustomerInputFieldLayout(QHBoxLayout, VerifyInputWidget):
     """Customer Input Field Layout class"""
 
     def __init__(self, left_attr: DotDict, right_attr: DotDict = None):
@@ -328,16 +336,7 @@ class CustomerInputFieldLayout(QHBoxLayout, Style):
 
         self.left_field = self._build_field(left_attr)
         self._add_field_to_layout(self.left_field)
-        left_attr.update({
-            'input_widget': self.left_field.input_widget,
-            'error_widget': self.left_field.error_widget
-        })
-        self._connect_text_entered(
-            self.left_field.input_widget,
-            self.left_field.error_widget,
-            left_attr.pattern.value,
-            left_attr.error_msg.value
-        )
+        left_attr.update(self._connect_text_entered(self.left_field, left_attr.rule))
 
         # If row have 2 column
         self.right_field = None
@@ -345,16 +344,7 @@ class CustomerInputFieldLayout(QHBoxLayout, Style):
             self.addStretch(1)
             self.right_field = self._build_field(right_attr)
             self._add_field_to_layout(self.right_field)
-            right_attr.update({
-                'input_widget': self.right_field.input_widget,
-                'error_widget': self.right_field.error_widget
-            })
-            self._connect_text_entered(
-                self.right_field.input_widget,
-                self.right_field.error_widget,
-                right_attr.pattern.value,
-                right_attr.error_msg.value
-            )
+            right_attr.update(self._connect_text_entered(self.right_field, right_attr.rule))
 
         self.addStretch(1)
 
@@ -368,7 +358,7 @@ class CustomerInputFieldLayout(QHBoxLayout, Style):
         self.set_style(input_widget)
 
         error_widget = QLabel()
-        error_widget.setObjectName('invisible_error_label')
+        error_widget.setObjectName('error_label')
         self.set_style(error_widget)
 
         return DotDict({
@@ -392,10 +382,11 @@ class CustomerInputFieldLayout(QHBoxLayout, Style):
 
         self.addLayout(combo)
 
-    def _connect_text_entered(self, input_widget, error_widget, pattern: str, error_msg: str):
-        """Connect textChanged to an uppercase function with recursion guard."""
+    def _connect_text_entered(self, field: DotDict, rule: FieldRule) -> dict:
+        """Connect textChanged to a title case function with recursion guard and attach the field validator."""
+        input_widget = field.input_widget
+
         def on_text_changed(text):
-            # ---- 1. Title Case formatting ----
             if not text:
                 return
             formatted = text.title()
@@ -406,22 +397,13 @@ class CustomerInputFieldLayout(QHBoxLayout, Style):
                 input_widget.setCursorPosition(cursor_pos)
                 input_widget.blockSignals(False)
 
-            # ---- 2. Regex validation ----
-            if re.fullmatch(pattern, text.lower()) or not text:
-                # Valid or empty → hide error
-                input_widget.setObjectName('customer_input')
-                error_widget.setObjectName('invisible_error_label')
-                self.set_style(input_widget)
-                self.set_style(error_widget)
-            else:
-                # Invalid → show error
-                error_widget.setText(error_msg)
-                input_widget.setObjectName('error_input')
-                error_widget.setObjectName('visible_error_label')
-                self.set_style(input_widget)
-                self.set_style(error_widget)
-
         input_widget.textChanged.connect(on_text_changed)
+        field.validator = FieldValidator(self, input_widget, field.error_widget, rule)
+        return {
+            'input_widget': input_widget,
+            'error_widget': field.error_widget,
+            'validator': field.validator
+        }
 
 
 class VerticalTabBar(QTabBar, Style):
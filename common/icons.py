@@ -0,0 +1,45 @@
+""" Icon cache module """
+
+
+import qtawesome as qta
+from PyQt5.QtGui import QIcon, QPixmap
+
+from common.constants import AppIcon
+
+ICON_SIZE = 64
+
+_pixmaps = {}   # (icon, size) -> QPixmap
+_icons = {}     # (icon, size) -> QIcon
+
+
+def get_pixmap(icon: AppIcon, size: int = ICON_SIZE) -> QPixmap:
+    """ Glyph of icon rendered once at size x size, shared by all callers """
+    key = (icon, size)
+    pixmap = _pixmaps.get(key)
+    if pixmap is None:
+        name, color = icon.value
+        options = {'color': color} if color else {}
+        pixmap = qta.icon(name, **options).pixmap(size, size)
+        _pixmaps[key] = pixmap
+    return pixmap
+
+
+def get_icon(icon: AppIcon, size: int = ICON_SIZE) -> QIcon:
+    """
+    Shared QIcon backed by a pre-rendered pixmap.
+
+    Unlike qtawesome icons, which paint the font glyph again on every request,
+    smaller sizes are scaled from the cached pixmap.
+    """
+    key = (icon, size)
+    cached = _icons.get(key)
+    if cached is None:
+        cached = QIcon(get_pixmap(icon, size))
+        _icons[key] = cached
+    return cached
+
+
+def prewarm(icons=AppIcon, size: int = ICON_SIZE) -> None:
+    """ Render icons ahead of first use, needs a QApplication """
+    for icon in icons:
+        get_icon(icon, size)
@@ -1,5 +1,5 @@
 """
-Loading widget that simulates application startup and checks MongoDB connection
+Loading widget that starts MongoDB and waits until the database is ready
 """
 
 
@@ -11,11 +11,14 @@ from PyQt5.QtCore import pyqtSignal, Qt, QRectF, QTimer
 from PyQt5.QtGui import QPainter, QPen, QColor
 
 from common.custom_widget import MessageBoxWidget
-from common.constants import MessageBoxType
+from common.constants import MessageBoxType, StartupStage
 from common.app_context import AppContext
 from common.styling import Style
 from tools.mongodb_client import MongoDBClient
-from tools.process_helper import start_broker
+from tools.process_helper import BrokerSupervisor, wait_for_port
+from tools.utils import retry_with_backoff
+
+PING_TIMEOUT = 1.0
 
 
 class CircularLoading(QWidget):
@@ -46,15 +49,18 @@ class CircularLoading(QWidget):
         painter.drawArc(rect, -self.angle * 16, 80 * 16)
 
 class LoadingWidget(QWidget, Style):
-    """ Loading widget that simulates application startup and checks MongoDB connection """
+    """ Loading widget that starts MongoDB and reports real readiness stages """
     progress_update = pyqtSignal(int)
     percent_update = pyqtSignal(str)
+    stage_update = pyqtSignal(str)
     finished = pyqtSignal()
-    failed = pyqtSignal()
+    failed = pyqtSignal(str)
 
     def __init__(self, context: AppContext):
         super().__init__()
         self.mongodb_client: MongoDBClient = context.mongodb_client
+        self.broker: BrokerSupervisor = context.broker
+        self.startup_timeout = context.config.startup_timeout_ms / 1000
         self.init_ui()
 
     def init_ui(self):
@@ -99,39 +105,64 @@ class LoadingWidget(QWidget, Style):
         layout.setContentsMargins(60, 40, 60, 40)
         self.setLayout(layout)
 
-    def on_connect_failed(self):
+    def on_connect_failed(self, reason: str):
         """ On connection failure, show error message and close the loading widget """
         warning_box = MessageBoxWidget(
             MessageBoxType.ERROR,
             "Mở ứng dụng thất bại",
-            "Không thể kết nối đến MongoDB. Vui lòng kiểm tra lại kết nối và khởi động lại ứng dụng."
+            f"Không thể kết nối đến MongoDB ({reason}). "
+            "Vui lòng kiểm tra lại kết nối và khởi động lại ứng dụng."
         )
         warning_box.exec_()
         self.close()
 
+    def report_stage(self, stage: StartupStage):
+        """ Show a reached startup stage on the progress bar """
+        self.stage_update.emit(stage.description)
+        self.percent_update.emit(f"{stage.percent}%")
+        self.progress_update.emit(stage.percent)
+
     def run(self):
-        """ Thread function to simulate loading and check MongoDB connection """
-        start_broker()
-        wait_time = 5
-        tick_time = 0.1
-        start_time = time.monotonic()
-        while time.monotonic() - start_time < wait_time:
-            time.sleep(tick_time)
-            elapsed = time.monotonic() - start_time
-            percent = int((elapsed / wait_time) * 100)
-            self.percent_update.emit(str(percent) + '%')
-            self.progress_update.emit(percent)
-        sts = self.mongodb_client.check_connection()
-        if not sts:
-            self.failed.emit()
-        else:
-            self.finished.emit()
+        """ Thread function, any error ends in `failed` so the loading widget never hangs """
+        try:
+            self.start_database()
+        except Exception as err: # pylint: disable=broad-exception-caught
+            print(f"[ERROR] Startup failed: {err}")
+            self.failed.emit(f"lỗi khởi động: {err}")
+
+    def start_database(self):
+        """ Start MongoDB and wait until it is usable, bounded by startup timeout """
+        deadline = time.monotonic() + self.startup_timeout
+
+        if not self.broker.start(deadline):
+            self.failed.emit(f"không khởi động được MongoDB: {self.broker.error}")
+            return
+        self.report_stage(StartupStage.BROKER_SPAWN)
+
+        host, port = self.mongodb_client.address
+        if not wait_for_port(host, port, deadline):
+            self.failed.emit(f"cổng {host}:{port} không mở sau {self.startup_timeout:.0f} giây")
+            return
+        self.report_stage(StartupStage.PORT_OPEN)
+
+        if not retry_with_backoff(lambda: self.mongodb_client.ping(PING_TIMEOUT), deadline):
+            self.failed.emit(f"không nhận được phản hồi ping sau {self.startup_timeout:.0f} giây")
+            return
+        self.report_stage(StartupStage.PING_OK)
+
+        # Runs index migrations, then lets main window start loading suggestions
+        if not self.mongodb_client.check_connection():
+            self.failed.emit("không đọc được thông tin máy chủ")
+            return
+        self.report_stage(StartupStage.INDEXES_READY)
+        self.finished.emit()
 
     def start_loading(self, show_callback):
         """ Start the loading process and show the widget """
         self.show()
         self.percent_update.connect(self.label_percent.setText)
         self.progress_update.connect(self.pbar.setValue)
+        self.stage_update.connect(self.label_desc.setText)
         self.finished.connect(show_callback)
         self.finished.connect(self.close)
         self.failed.connect(self.on_connect_failed)
@@ -0,0 +1,253 @@
+"""
+Indexed completer for product and customer suggestions.
+
+Suggestions are matched on folded text: NFKD decomposed, combining marks dropped, 'đ' mapped
+to 'd' and lower-cased, so "ca phe" finds "Cà Phê". Whole entries and every later word start
+are kept in sorted key lists for prefix lookups, and trigram postings narrow substring lookups
+to a few candidates, so a keystroke never scans all suggestions.
+"""
+import re
+import heapq
+import unicodedata
+from collections import defaultdict
+from bisect import bisect_left
+
+from PyQt5.QtCore import QStringListModel, Qt, pyqtSignal
+from PyQt5.QtWidgets import QCompleter
+
+MAX_RESULTS = 50
+NGRAM_SIZE = 3
+# Results of one and two character queries are large ranges, keep them until the index changes
+SHORT_QUERY_LENGTH = 2
+# Sorts after any folded text, bounds a prefix range
+MAX_CHAR = '\U0010ffff'
+
+_FOLD_TABLE = str.maketrans({'đ': 'd', 'Đ': 'd'})
+# Combining diacritical marks block, holds every Vietnamese tone and vowel mark
+_COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+
+
+def fold_text(text: str) -> str:
+    """ Lower-case text without diacritics and with single spaces, used for matching only """
+    stripped = _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text.translate(_FOLD_TABLE)))
+    return ' '.join(stripped.lower().split())
+
+
+def _ngrams_of(folded: str) -> set[str]:
+    return {folded[i:i + NGRAM_SIZE] for i in range(len(folded) - NGRAM_SIZE + 1)}
+
+
+class SortedKeys():
+    """
+    Sorted (folded key, entry id) pairs kept as a few sorted runs.
+
+    Each batch becomes a run, runs are merged while the newer one is at least as large as
+    the one before it, so there are never more than log2(n) runs and loading suggestions
+    page by page does not re-sort everything. Lookups bisect every run.
+    """
+    def __init__(self):
+        self._runs: list[list[tuple[str, int]]] = []
+
+    def extend(self, pairs: list[tuple[str, int]]) -> None:
+        """ Add pairs """
+        if not pairs:
+            return
+        run = sorted(pairs)
+        while self._runs and len(self._runs[-1]) <= len(run):
+            older = self._runs.pop()
+            # Two sorted runs, timsort merges them in linear time
+            older.extend(run)
+            older.sort()
+            run = older
+        self._runs.append(run)
+
+    def remove(self, pair: tuple[str, int]) -> None:
+        """ Remove one pair """
+        for keys in self._runs:
+            position = bisect_left(keys, pair)
+            if position < len(keys) and keys[position] == pair:
+                del keys[position]
+                return
+
+    def ids_with_prefix(self, folded: str) -> list[int]:
+        """ Entry ids of keys starting with folded query, in key order within each run """
+        ids = []
+        for keys in self._runs:
+            first = bisect_left(keys, (folded,))
+            last = bisect_left(keys, (folded + MAX_CHAR,), first)
+            ids.extend(entry_id for _, entry_id in keys[first:last])
+        return ids
+
+
+class SearchIndex():
+    """
+    Ranked lookup of display strings.
+
+    Results come prefix hits first (the whole entry starts with the query), then entries
+    with a later word starting with the query, then entries containing it anywhere. Within
+    a tier entries with a higher weight, the sale count, come first. Queries shorter than
+    the n-gram size only match prefixes and word prefixes.
+    """
+    def __init__(self, max_results: int = MAX_RESULTS):
+        self.max_results = max_results
+        self._ids: dict[str, int] = {}         # display -> entry id
+        self._displays: list[str] = []         # entry id -> display, None once discarded
+        self._folded: list[str] = []
+        self._weights: list[int] = []
+        # Whole entries, and entries from each later word start
+        self._prefix_keys = SortedKeys()
+        self._word_keys = SortedKeys()
+        self._ngrams: dict[str, list[int]] = defaultdict(list)
+        self._short_cache: dict[str, list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, display: str) -> bool:
+        return display in self._ids
+
+    def weight(self, display: str) -> int:
+        """ Weight of an entry, 0 when it is not indexed """
+        entry_id = self._ids.get(display)
+        return 0 if entry_id is None else self._weights[entry_id]
+
+    def add(self, display: str, weight: int = 0) -> None:
+        """ Index one display string, or only update its weight when already indexed """
+        self.update([(display, weight)])
+
+    def update(self, entries) -> None:
+        """ Index many (display, weight) pairs, keys are sorted once for the whole batch """
+        self._short_cache.clear()
+        ids, weights, ngrams = self._ids, self._weights, self._ngrams
+        new_ids = []
+        for display, weight in entries:
+            entry_id = ids.get(display)
+            if entry_id is not None:
+                weights[entry_id] = weight
+                continue
+
+            entry_id = len(self._displays)
+            folded = fold_text(display)
+            ids[display] = entry_id
+            self._displays.append(display)
+            self._folded.append(folded)
+            weights.append(weight)
+            new_ids.append(entry_id)
+            for ngram in _ngrams_of(folded):
+                ngrams[ngram].append(entry_id)
+
+        prefix_pairs, word_pairs = [], []
+        for entry_id in new_ids:
+            prefix_pair, entry_word_pairs = self._keys_of(entry_id)
+            prefix_pairs.append(prefix_pair)
+            word_pairs.extend(entry_word_pairs)
+        self._prefix_keys.extend(prefix_pairs)
+        self._word_keys.extend(word_pairs)
+
+    def _keys_of(self, entry_id: int) -> tuple[tuple[str, int], list[tuple[str, int]]]:
+        """ Whole entry key and the keys of each later word start of one entry """
+        folded = self._folded[entry_id]
+        word_pairs = []
+        start = folded.find(' ')
+        while start != -1:
+            word_pairs.append((folded[start + 1:], entry_id))
+            start = folded.find(' ', start + 1)
+        return (folded, entry_id), word_pairs
+
+    def discard(self, display: str) -> None:
+        """ Remove one entry """
+        entry_id = self._ids.pop(display, None)
+        if entry_id is None:
+            return
+        self._short_cache.clear()
+        prefix_pair, word_pairs = self._keys_of(entry_id)
+        self._prefix_keys.remove(prefix_pair)
+        for pair in word_pairs:
+            self._word_keys.remove(pair)
+        for ngram in _ngrams_of(self._folded[entry_id]):
+            self._ngrams[ngram].remove(entry_id)
+        self._displays[entry_id] = None
+
+    def clear(self) -> None:
+        """ Remove all entries """
+        self.__init__(self.max_results)
+
+    def search(self, query: str) -> list[str]:
+        """ Ranked display strings matching query, at most max_results of them """
+        folded = fold_text(query)
+        if not folded:
+            return []
+        if folded in self._short_cache:
+            return self._short_cache[folded]
+
+        tier_sources = [
+            lambda: self._prefix_keys.ids_with_prefix(folded),
+            # An entry can have several words starting with the query
+            lambda: list(dict.fromkeys(self._word_keys.ids_with_prefix(folded))),
+        ]
+        if len(folded) >= NGRAM_SIZE:
+            tier_sources.append(lambda: self._substring_matches(folded))
+
+        ranked, seen = [], set()
+        for source in tier_sources:
+            candidates = source()
+            if seen:
+                candidates = [entry_id for entry_id in candidates if entry_id not in seen]
+            # nlargest is stable, equal weights keep the key order of the candidates
+            top = heapq.nlargest(self.max_results - len(ranked), candidates, key=self._weights.__getitem__)
+            ranked.extend(top)
+            if len(ranked) >= self.max_results:
+                break
+            seen.update(candidates)
+
+        results = [self._displays[entry_id] for entry_id in ranked]
+        if len(folded) <= SHORT_QUERY_LENGTH:
+            self._short_cache[folded] = results
+        return results
+
+    def _substring_matches(self, folded: str) -> list[int]:
+        """ Ids of entries containing folded query, checked against the rarest trigram's postings """
+        postings = None
+        for i in range(len(folded) - NGRAM_SIZE + 1):
+            candidates = self._ngrams.get(folded[i:i + NGRAM_SIZE])  # get, not [], adds no empty postings
+            if not candidates:
+                return []
+            if postings is None or len(candidates) < len(postings):
+                postings = candidates
+        if len(folded) == NGRAM_SIZE:
+            return postings
+        texts = self._folded
+        return [entry_id for entry_id in postings if folded in texts[entry_id]]
+
+
+class SearchCompleter(QCompleter):
+    """
+    Popup completer serving ranked results of a SearchIndex.
+
+    The popup model only ever holds the current results, `activated` still emits the chosen
+    display string so existing handlers keep working. `path_edited` lets a remote source
+    fill the index while the user types.
+    """
+    path_edited = pyqtSignal(str)
+
+    def __init__(self, parent=None, max_results: int = MAX_RESULTS):
+        super().__init__(parent)
+        self.index = SearchIndex(max_results)
+        self.results_model = QStringListModel(self)
+        self.setModel(self.results_model)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+
+    def splitPath(self, path: str) -> list[str]:  # pylint: disable=invalid-name
+        """ Called by Qt for each edit, replace the popup rows with results for path """
+        self.results_model.setStringList(self.index.search(path))
+        self.path_edited.emit(path)
+        return []
+
+    def show_results(self, path: str) -> None:
+        """ Re-run path against the index after it changed and show the popup when there are results """
+        results = self.index.search(path)
+        self.results_model.setStringList(results)
+        widget = self.widget()
+        if results and widget is not None and widget.hasFocus():
+            self.complete()
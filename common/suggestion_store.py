@@ -0,0 +1,117 @@
+""" Suggestion Store Module """
+
+
+from typing import Callable, Iterable
+
+from common.search_completer import SearchIndex
+
+
+class SuggestionStore():
+    """
+    Deduplicated suggestion records behind a completer.
+
+    Records are kept by key (product id, customer phone) with O(1) insert, update and
+    removal. Each record has one display string, mapped back to the record when a completer
+    entry is chosen, and may be looked up by the values of `lookup_fields`. Changes are
+    pushed to the SearchIndex in batches, the completer model is never rebuilt.
+    """
+    def __init__(
+            self,
+            index: SearchIndex,
+            key_of: Callable[[dict], str],
+            display_of: Callable[[dict], str],
+            weight_of: Callable[[dict], int] = None,
+            lookup_fields: tuple[str, ...] = ()
+        ):
+        self.index = index
+        self.key_of = key_of
+        self.display_of = display_of
+        self.weight_of = weight_of or (lambda record: 0)
+        self._records: dict[str, dict] = {}
+        self._displays: dict[str, str] = {}     # display -> key
+        # field -> value -> keys, dict keys keep insertion order
+        self._lookups: dict[str, dict[str, dict[str, None]]] = {field: {} for field in lookup_fields}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def empty_copy(self) -> 'SuggestionStore':
+        """ Empty store over a new SearchIndex, can be filled on a worker thread and swapped in """
+        return SuggestionStore(
+            SearchIndex(self.index.max_results), self.key_of, self.display_of, self.weight_of, tuple(self._lookups)
+        )
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._records
+
+    def get(self, key: str) -> dict:
+        """ Record by key, None when unknown """
+        return self._records.get(key)
+
+    def records(self) -> list[dict]:
+        """ All records in insertion order """
+        return list(self._records.values())
+
+    def record_of(self, display: str) -> dict:
+        """ Record shown as display in the completer, None when unknown """
+        key = self._displays.get(display)
+        return None if key is None else self._records[key]
+
+    def find(self, field: str, value) -> list[dict]:
+        """ Records whose lookup field equals value """
+        return [self._records[key] for key in self._lookups[field].get(value, ())]
+
+    def count(self, field: str, value) -> int:
+        """ Number of records whose lookup field equals value """
+        return len(self._lookups[field].get(value, ()))
+
+    def values(self, field: str) -> list:
+        """ Distinct values of a lookup field """
+        return list(self._lookups[field])
+
+    def apply(self, added: Iterable[dict] = (), removed: Iterable[str] = ()) -> None:
+        """
+        Add or replace records and remove records by key in one batch.
+
+        A record replacing one with the same key moves its display string when it changed,
+        removals of unknown keys are ignored.
+        """
+        for key in removed:
+            record = self._records.pop(key, None)
+            if record is not None:
+                self._unlink(key, record)
+
+        entries = []
+        for record in added:
+            key = self.key_of(record)
+            previous = self._records.get(key)
+            if previous is not None:
+                self._unlink(key, previous, keep_display=self.display_of(record))
+            self._records[key] = record
+            display = self.display_of(record)
+            self._displays[display] = key
+            for field, values in self._lookups.items():
+                values.setdefault(record.get(field), {})[key] = None
+            entries.append((display, self.weight_of(record)))
+        self.index.update(entries)
+
+    def _unlink(self, key: str, record: dict, keep_display: str = None) -> None:
+        """ Drop display and lookup entries of a record """
+        display = self.display_of(record)
+        if display != keep_display and self._displays.get(display) == key:
+            del self._displays[display]
+            self.index.discard(display)
+        for field, values in self._lookups.items():
+            keys = values.get(record.get(field))
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del values[record.get(field)]
+
+    def clear(self) -> None:
+        """ Remove all records """
+        self._records.clear()
+        self._displays.clear()
+        for values in self._lookups.values():
+            values.clear()
+        self.index.clear()
@@ -0,0 +1,114 @@
+"""
+Declarative validation schemas for customer and line item records.
+
+Every pattern is compiled once at import. A schema checks a whole record in one pass and
+returns structured FieldError objects, the forms, the bulk import and the keystroke checks
+all share the same rules.
+"""
+import re
+from typing import Iterable
+
+from common.constants import RegexPatterns, ErrorMessage, CustomerAttribute, TableAttribute
+
+
+class FieldRule():
+    """ Compiled rule of one field """
+    __slots__ = ('key', 'pattern', 'error_msg', 'required', 'strip')
+
+    def __init__(self, key, pattern: RegexPatterns, error_msg: ErrorMessage, required: bool = True,
+                 strip: bool = False):
+        self.key = key
+        self.pattern = re.compile(pattern.value)
+        self.error_msg = error_msg
+        self.required = required
+        self.strip = strip
+
+    def clean(self, value: str) -> str:
+        """ Value as checked, surrounding whitespace removed for stripped rules """
+        return value.strip() if self.strip else value
+
+    def check(self, value: str) -> ErrorMessage:
+        """ Error of value, None when it is valid; empty optional values are valid """
+        value = self.clean(value)
+        if not value:
+            return ErrorMessage.EMPTY_VALUE if self.required else None
+        if self.pattern.fullmatch(value.lower()):
+            return None
+        return self.error_msg
+
+
+class FieldError():
+    """ Validation error of one field, `line` is set for rows of a batch """
+    __slots__ = ('key', 'error', 'line')
+
+    def __init__(self, key, error: ErrorMessage, line: int = None):
+        self.key = key
+        self.error = error
+        self.line = line
+
+    @property
+    def message(self) -> str:
+        """ Error text """
+        return self.error.value
+
+    def __str__(self) -> str:
+        if self.line is None:
+            return f"{self.key.value}: {self.message}"
+        return f"Dòng {self.line}, {self.key.value}: {self.message}"
+
+
+class Schema():
+    """ Ordered field rules of one record type, records are keyed by the rule keys """
+    def __init__(self, rules: Iterable[FieldRule]):
+        self.rules = {rule.key: rule for rule in rules}
+
+    def __getitem__(self, key) -> FieldRule:
+        return self.rules[key]
+
+    def __iter__(self):
+        return iter(self.rules.values())
+
+    def validate(self, record: dict, line: int = None) -> list[FieldError]:
+        """ Errors of all fields of record, missing fields count as empty """
+        errors = []
+        for key, rule in self.rules.items():
+            error = rule.check(record.get(key) or "")
+            if error is not None:
+                errors.append(FieldError(key, error, line))
+        return errors
+
+    def validate_many(self, records: Iterable[tuple[int, dict]]) -> tuple[list[dict], list[FieldError]]:
+        """ Validate (line, record) pairs, return the valid records and the errors of the others """
+        valid_records, errors = [], []
+        for line, record in records:
+            record_errors = self.validate(record, line)
+            if record_errors:
+                errors.extend(record_errors)
+            else:
+                valid_records.append(record)
+        return valid_records, errors
+
+
+CUSTOMER = Schema([
+    FieldRule(CustomerAttribute.NAME, RegexPatterns.ONLY_LETTERS, ErrorMessage.ONLY_LETTER),
+    FieldRule(CustomerAttribute.PHONE_NUMBER, RegexPatterns.PHONE_NUMBER, ErrorMessage.INVALID_PHONE),
+    FieldRule(
+        CustomerAttribute.COMPANY, RegexPatterns.LETTERS_AND_DIGITS, ErrorMessage.ONLY_LETTER_AND_NUMBER,
+        required=False
+    ),
+    FieldRule(
+        CustomerAttribute.ADDRESS, RegexPatterns.LETTERS_AND_DIGITS, ErrorMessage.INVALID_SPECIAL_CHAR,
+        required=False
+    ),
+    FieldRule(CustomerAttribute.TAX_NUMBER, RegexPatterns.ONLY_DIGITS, ErrorMessage.ONLY_NUMBER, required=False),
+    FieldRule(CustomerAttribute.PAYMENT_OPTIONS, RegexPatterns.ONLY_LETTERS, ErrorMessage.ONLY_LETTER, required=False),
+])
+
+# Fields of a cart line in product form and import column order. Quantity and price are
+# parsed with int() once valid, so only plain digits pass, no inner spaces or separators
+LINE_ITEM = Schema([
+    FieldRule(TableAttribute.NAME, RegexPatterns.LETTERS_AND_DIGITS, ErrorMessage.ONLY_LETTER_AND_NUMBER),
+    FieldRule(TableAttribute.QUANTITY, RegexPatterns.POSITIVE_INTEGER, ErrorMessage.POSITIVE_INTEGER, strip=True),
+    FieldRule(TableAttribute.TYPE, RegexPatterns.LETTERS_AND_DIGITS, ErrorMessage.ONLY_LETTER_AND_NUMBER),
+    FieldRule(TableAttribute.PRICE, RegexPatterns.INTEGER, ErrorMessage.ONLY_NUMBER, strip=True),
+])
@@ -10,6 +10,8 @@ from common.custom_widget import MessageBoxWidget
 from common.app_context import AppContext
 from tools.utils import expand_env_vars_in_path
 from tools.utils import encode_product_id, save_json, load_json
+from tools.mongodb_client import InvoiceCommit, SALE_COUNT_FIELD
+from tools.write_queue import WriteJob
 
 
 class DataCollectors:
@@ -18,77 +20,97 @@ class DataCollectors:
     def __init__(self, parent_view):
         self.parent_view = parent_view
         self.context: AppContext = self.parent_view.context
-
-    def _upload_to_database(self, data: dict|list, collection_name: list) -> bool:
-        """ Upload data to database """
-        sts = self.context.mongodb_client.add_document(data, collection_name)
-        if not sts:
-            error_box = MessageBoxWidget(
-                MessageBoxType.ERROR,
-                "Lỗi lưu dữ liệu",
-                f"Không thể lưu dữ liệu vào database {collection_name.name.lower()}. Thông tin sẽ được lưu vào file local.",
-            )
-            error_box.exec_()
-
-            # Save data to local file
-            try:
-                backup_folder = expand_env_vars_in_path(self.context.config.backup_folder)
-                os.makedirs(backup_folder, exist_ok=True)
-
-                filename = os.path.join(backup_folder, f"{f"{data['_id']}.json"}")
-                save_json(data.to_dict(), filename)
-            except Exception as e: # pylint: disable=broad-exception-caught
-                print(f"[ERROR] Failed to save data to local file: {e}")
-                return False
+        self._uploading: dict[tuple, str] = {}  # job key -> backup file queued for upload
+        self._failed_collections: dict[str, int] = {}
+        self._failure_notice: MessageBoxWidget = None
+
+    def _save_local_backup(self, data: dict) -> bool:
+        """ Save data to local file so it can be uploaded later """
+        try:
+            backup_folder = expand_env_vars_in_path(self.context.config.backup_folder)
+            os.makedirs(backup_folder, exist_ok=True)
+
+            filename = os.path.join(backup_folder, f"{data['_id']}.json")
+            save_json(data, filename)
+        except Exception as e: # pylint: disable=broad-exception-caught
+            print(f"[ERROR] Failed to save data to local file: {e}")
+            return False
         return True
 
-    def _upload_customer_data(self, customer_id: str, customer_data: dict) -> bool:
-        """ Upload customer data to database """
-        customer_data.update({
-            "_id": customer_id
-        })
-        return self._upload_to_database(customer_data, DBCollection.CUSTOMER)
-
-    def _upload_invoice_data(self, invoice_id: str, products: list, customer_id: str) -> bool:
-        """ Upload invoice data to database """
-        invoice = {
-            "_id": invoice_id,
-            "data": products,
-            "customer_id": customer_id,
-            "updated_at": datetime.now().isoformat()
-        }
-        return self._upload_to_database(invoice, DBCollection.INVOICE)
+    def _commit_invoice(self, commit: InvoiceCommit) -> bool:
+        """ Queue customer, products and invoice for upload to database in one commit """
+        if not self.context.mongodb_client.write_queue.put_commit(commit):
+            return all([self._save_local_backup(doc) for _, doc in commit.documents()])
+        return True
 
-    def _build_invoice_by_product_data(self, invoice_data: list) -> list:
-        """ Collect product data from table """
+    def on_write_failed(self, job: WriteJob) -> None:
+        """ Save documents of a failed background write to local file """
+        # Backup file of a failed upload is written again below, keep it
+        self._uploading.pop(job.key, None)
+        self.save_jobs_to_local([job])
+
+        collection_name = job.collection_type.name.lower() if job.collection_type else "invoice"
+        self._failed_collections[collection_name] = self._failed_collections.get(collection_name, 0) + 1
+        self._show_failure_notice()
+
+    def on_write_finished(self, job: WriteJob) -> None:
+        """ Remove the backup file of an uploaded document once it is written """
+        json_path = self._uploading.pop(job.key, None)
+        if json_path is None:
+            return
+        try:
+            os.remove(json_path)
+        except OSError as e:
+            print(f"[ERROR] Failed to remove uploaded local file {json_path}: {e}")
+
+    def _show_failure_notice(self) -> None:
+        """ Show one non-modal notice for all failed writes until the user closes it """
+        failed = ", ".join(f"{name} ({count})" for name, count in self._failed_collections.items())
+        message = f"Không thể lưu dữ liệu vào database {failed}. Thông tin sẽ được lưu vào file local."
+        if self._failure_notice is not None:
+            self._failure_notice.setText(message)
+            return
+
+        self._failure_notice = MessageBoxWidget(MessageBoxType.ERROR, "Lỗi lưu dữ liệu", message)
+        self._failure_notice.finished.connect(self._on_failure_notice_closed)
+        self._failure_notice.setModal(False)
+        self._failure_notice.show()
+
+    def _on_failure_notice_closed(self, _) -> None:
+        self._failure_notice = None
+        self._failed_collections.clear()
+
+    def save_jobs_to_local(self, jobs: list[WriteJob]) -> bool:
+        """ Save documents of unwritten jobs to local file """
+        return all([self._save_local_backup(doc) for job in jobs for _, doc in job.documents()])
+
+    def _build_invoice_by_product_data(self, invoice_data: list) -> tuple[list, list]:
+        """ Collect product data from table, return invoice lines and product documents """
         products = []
+        product_docs = {}
         for item in invoice_data:
-            product_id = self.collect_product_data(item)
-            if not product_id:
-                return None
+            product = self.collect_product_data(item)
+            product_docs[product["_id"]] = product
             products.append({
-                "product_id": product_id,
+                "product_id": product["_id"],
                 "quantity": item[TableAttribute.QUANTITY.value],
                 "sum": item[TableAttribute.SUM.value],
             })
-        return products
+        return products, list(product_docs.values())
 
-    def collect_product_data(self, invoice_item: dict) -> str:
-        """ Collect product data from invoice data """
+    def collect_product_data(self, invoice_item: dict) -> dict:
+        """ Collect product document from invoice data """
         product_id = encode_product_id(
             invoice_item[TableAttribute.NAME.value],
             invoice_item[TableAttribute.TYPE.value],
             invoice_item[TableAttribute.PRICE.value]
         )
-        product = {
+        return {
             "_id": product_id,
             TableAttribute.NAME.value: invoice_item[TableAttribute.NAME.value],
             TableAttribute.TYPE.value: invoice_item[TableAttribute.TYPE.value],
             TableAttribute.PRICE.value: invoice_item[TableAttribute.PRICE.value]
         }
-        if not self._upload_to_database(product, DBCollection.PRODUCT):
-            return None
-        return product_id
 
     def collect_customer_data(self) -> tuple[str, dict]:
         """ Collect customer data from input field """
@@ -105,18 +127,19 @@ class DataCollectors:
             warning_box.exec_()
             return (None, None)
 
-        # Upload customer data to database
+        # Set customer data to user suggestion, counting this sale until the next refresh
         customer_id = customer_data[CustomerAttribute.PHONE_NUMBER.value]
-        if not self._upload_customer_data(customer_id, copy.deepcopy(customer_data)):
-            return (None, None)
-
-        # Set customer data to user suggestion
-        self.parent_view.customer_layout.user_suggestion[customer_id] = customer_data
+        previous = self.parent_view.customer_layout.suggestions.get(customer_id) or {}
+        self.parent_view.customer_layout.load_data_suggestion([{
+            **customer_data,
+            "_id": customer_id,
+            SALE_COUNT_FIELD: previous.get(SALE_COUNT_FIELD, 0) + 1
+        }])
 
         return (customer_id, customer_data)
 
-    def collect_invoice_data(self, customer_id:str) -> tuple[str, list]:
-        """ Collect invoice data from table """
+    def collect_invoice_data(self, customer_id: str, customer_data: dict) -> tuple[str, list]:
+        """ Collect invoice data from table and upload it together with customer data """
         # Get invoice data from table
         invoice_data = self.parent_view.middle_layout.table_layout.get_table_data()
 
@@ -132,12 +155,20 @@ class DataCollectors:
 
         # Build invoice data by product data
         invoice_id = f'invoice_{datetime.now().strftime("%y%m%d_%H%M%S")}'
-        products = self._build_invoice_by_product_data(invoice_data)
-        if not products:
-            return (None, None)
-
-        # Upload invoice data to database
-        if not self._upload_invoice_data(invoice_id, products , customer_id):
+        products, product_docs = self._build_invoice_by_product_data(invoice_data)
+
+        # Upload customer, products and invoice to database together
+        commit = InvoiceCommit(
+            customer={**copy.deepcopy(customer_data), "_id": customer_id},
+            products=product_docs,
+            invoice={
+                "_id": invoice_id,
+                "data": products,
+                "customer_id": customer_id,
+                "updated_at": datetime.now().isoformat()
+            }
+        )
+        if not self._commit_invoice(commit):
             return (None, None)
 
         return (invoice_id, invoice_data)
@@ -149,7 +180,6 @@ class DataCollectors:
             if filename.endswith('.json'):
                 name = filename[:-5]
                 json_path = os.path.join(backup_path, filename)
-                data = load_json(json_path).to_dict()
                 collection = None
                 if name.startswith("invoice_"):
                     collection = DBCollection.INVOICE
@@ -158,5 +188,12 @@ class DataCollectors:
                 else:
                     collection = DBCollection.PRODUCT
 
-                if collection and self._upload_to_database(data, collection):
-                    os.remove(json_path)
+                # Backup files are named by _id, skip the ones still queued from a previous call
+                job_key = (collection, name)
+                if job_key in self._uploading:
+                    continue
+
+                # File is removed by on_write_finished, a failed write keeps it through on_write_failed
+                data = load_json(json_path).to_dict()
+                if self.context.mongodb_client.write_queue.put_document(data, collection):
+                    self._uploading[job_key] = json_path
@@ -4,7 +4,6 @@
 from PyQt5.QtGui import QCloseEvent
 from PyQt5.QtWidgets import QFileDialog
 
-from tools.process_helper import stop_broker
 from tools.utils import expand_env_vars_in_path
 from common.constants import MessageBoxType
 from common.custom_widget import MessageBoxWidget
@@ -26,7 +25,19 @@ class Events():   # pylint:disable=R0903
         close_box.exec_()
 
         if close_box.clickedButton() == close_box.button_accept:
-            stop_broker()
+            # Flush pending database writes, keep unwritten ones in local file
+            unwritten = self.context.mongodb_client.write_queue.stop(
+                timeout=self.context.config.mongodb_timeout / 1000
+            )
+            if unwritten:
+                self.parent_view.tab_widget.sales_management_tab.data_collectors.save_jobs_to_local(unwritten)
+            # Drop exports not started yet, give the running one a bounded time to finish;
+            # their sales are already saved
+            exporter = self.parent_view.tab_widget.sales_management_tab.events.exporter
+            exporter.cancel_queued()
+            if not exporter.wait_for_done(self.context.config.export_close_timeout_ms):
+                print("[ERROR] Invoice export did not finish before closing")
+            self.context.broker.stop()
             event.accept()
         else:
             event.ignore()
@@ -1,12 +1,12 @@
 """ Main Layout Module """
 
 
-import qtawesome as qta
 from PyQt5.QtCore import QSize
 from PyQt5.QtWidgets import QTabWidget
 
 from common.custom_widget import VerticalTabBar
-from common.constants import TabAttribute
+from common.constants import TabAttribute, AppIcon
+from common.icons import get_icon
 from common.styling import Style
 from layout.sales_mngr.sale_management_widget import SalesManagementWidget
 
@@ -27,6 +27,6 @@ class MainTabWidget(QTabWidget, Style): # pylint:disable=R0903
 
         self.setIconSize(QSize(32, 32))
 
-        sale_icon = qta.icon("ri.shopping-cart-line", color="#132440")
+        sale_icon = get_icon(AppIcon.SALES_TAB)
         index = self.addTab(self.sales_management_tab, sale_icon, "")
         self.tabBar().setTabToolTip(index, TabAttribute.SALES_MANAGEMENT.value)
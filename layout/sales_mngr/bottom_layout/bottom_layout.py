@@ -1,11 +1,11 @@
 """ Bottom Layout Module """
 
 
-import qtawesome as qta
-
-from PyQt5.QtWidgets import QHBoxLayout, QPushButton
+from PyQt5.QtWidgets import QHBoxLayout, QPushButton, QProgressBar
 
 from common.styling import Style
+from common.constants import AppIcon
+from common.icons import get_icon
 
 
 class BottomLayout(QHBoxLayout, Style):
@@ -13,13 +13,37 @@ class BottomLayout(QHBoxLayout, Style):
     def __init__(self):
         super().__init__()
 
-        save_icon = qta.icon('fa5s.file-export', color='white')
+        save_icon = get_icon(AppIcon.EXPORT)
         self.export_button = QPushButton(text='Xuất hóa đơn', icon=save_icon)
         self.export_button.setObjectName('common_button')
         self.set_style(self.export_button)
 
+        # Progress of background invoice exports, hidden while idle
+        self.export_progress = QProgressBar()
+        self.export_progress.setRange(0, 100)
+        self.export_progress.setMinimumWidth(320)
+        self.export_progress.hide()
+        self.cancel_export_button = QPushButton(text='Hủy xuất')
+        self.cancel_export_button.setObjectName('common_button')
+        self.set_style(self.cancel_export_button)
+        self.cancel_export_button.hide()
+
         self.__init_ui()
 
     def __init_ui(self):
+        self.addWidget(self.export_progress)
+        self.addWidget(self.cancel_export_button)
         self.addStretch()
         self.addWidget(self.export_button)
+
+    def show_export_progress(self, text: str, percent: int) -> None:
+        """ Show stage of the running export """
+        self.export_progress.setFormat(text)
+        self.export_progress.setValue(percent)
+        self.export_progress.show()
+        self.cancel_export_button.show()
+
+    def hide_export_progress(self) -> None:
+        """ Hide progress once no export is left """
+        self.export_progress.hide()
+        self.cancel_export_button.hide()
@@ -1,13 +1,17 @@
 """ Top Layout Module """
 
-import qtawesome as qta
-
 from pydotdict import DotDict
-from PyQt5.QtCore import QStringListModel, QTimer, Qt
-from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QFrame, QPushButton, QWidget, QLabel, QCompleter
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QFrame, QPushButton, QWidget, QLabel
 
 from common.custom_widget import CustomerInputFieldLayout, VerifyInputWidget
-from common.constants import CustomerAttribute, RegexPatterns, ErrorMessage
+from common.constants import CustomerAttribute, AppIcon
+from common.icons import get_icon
+from common.search_completer import SearchCompleter
+from common.suggestion_store import SuggestionStore
+from common.validation import CUSTOMER
+from layout.sales_mngr.customer_layout.customer_search import RemoteCustomerSearch
+from tools.mongodb_client import SALE_COUNT_FIELD
 
 
 class CustomerLayout(QVBoxLayout, VerifyInputWidget):
@@ -18,33 +22,27 @@ class CustomerLayout(QVBoxLayout, VerifyInputWidget):
     _customer_dict = DotDict({
         CustomerAttribute.NAME: {
             'title': f'{CustomerAttribute.NAME.value}:',
-            'pattern': RegexPatterns.ONLY_LETTERS,
-            'error_msg': ErrorMessage.ONLY_LETTER,
+            'rule': CUSTOMER[CustomerAttribute.NAME],
         },
         CustomerAttribute.PHONE_NUMBER: {
             'title': f'{CustomerAttribute.PHONE_NUMBER.value}:',
-            'pattern': RegexPatterns.PHONE_NUMBER,
-            'error_msg': ErrorMessage.INVALID_PHONE,
+            'rule': CUSTOMER[CustomerAttribute.PHONE_NUMBER],
         },
         CustomerAttribute.COMPANY: {
             'title': f'{CustomerAttribute.COMPANY.value}:',
-            'pattern': RegexPatterns.LETTERS_AND_DIGITS,
-            'error_msg': ErrorMessage.ONLY_LETTER_AND_NUMBER,
+            'rule': CUSTOMER[CustomerAttribute.COMPANY],
         },
         CustomerAttribute.ADDRESS: {
             'title': f'{CustomerAttribute.ADDRESS.value}:',
-            'pattern': RegexPatterns.LETTERS_AND_DIGITS,
-            'error_msg': ErrorMessage.INVALID_SPECIAL_CHAR,
+            'rule': CUSTOMER[CustomerAttribute.ADDRESS],
         },
         CustomerAttribute.TAX_NUMBER: {
             'title': f'{CustomerAttribute.TAX_NUMBER.value}:',
-            'pattern': RegexPatterns.ONLY_DIGITS,
-            'error_msg': ErrorMessage.ONLY_NUMBER,
+            'rule': CUSTOMER[CustomerAttribute.TAX_NUMBER],
         },
         CustomerAttribute.PAYMENT_OPTIONS: {
             'title': f'{CustomerAttribute.PAYMENT_OPTIONS.value}:',
-            'pattern': RegexPatterns.ONLY_LETTERS,
-            'error_msg': ErrorMessage.ONLY_LETTER,
+            'rule': CUSTOMER[CustomerAttribute.PAYMENT_OPTIONS],
         },
     })
 
@@ -55,9 +53,9 @@ class CustomerLayout(QVBoxLayout, VerifyInputWidget):
 
         super().__init__(self.frame)
         self.parent_view = parent
-        self.expand_icon = qta.icon('mdi.expand-all')
-        self.collapse_icon = qta.icon('mdi.collapse-all')
-        self.clear_icon = qta.icon('mdi6.broom', color='white')
+        self.expand_icon = get_icon(AppIcon.EXPAND)
+        self.collapse_icon = get_icon(AppIcon.COLLAPSE)
+        self.clear_icon = get_icon(AppIcon.BROOM)
 
         self.customer_name_phone_layout = CustomerInputFieldLayout(
             self._customer_dict[CustomerAttribute.NAME],
@@ -77,12 +75,32 @@ class CustomerLayout(QVBoxLayout, VerifyInputWidget):
             self._customer_dict[CustomerAttribute.PAYMENT_OPTIONS]
         )
 
-        self.user_suggestion = {}
-        self.user_model, self.completer = self.create_completer()
+        self.completer = SearchCompleter(self.frame)
+        self.suggestions = SuggestionStore(
+            self.completer.index,
+            key_of=lambda customer: customer[CustomerAttribute.PHONE_NUMBER.value],
+            display_of=self.suggestion_text,
+            weight_of=lambda customer: customer.get(SALE_COUNT_FIELD, 0),
+            lookup_fields=(CustomerAttribute.NAME.value,)
+        )
         self.customer_name_phone_layout.left_field.input_widget.setCompleter(self.completer)
         self.customer_name_phone_layout.right_field.input_widget.setCompleter(self.completer)
         self.completer.activated.connect(self.fill_fields)
 
+        # Remote mode keeps only the customers matching the current input in memory
+        self.remote_search = None
+        config = self.parent_view.context.config
+        if config.remote_customer_completion:
+            self.remote_search = RemoteCustomerSearch(
+                self.parent_view.context.mongodb_client,
+                delay_ms=config.remote_completion_delay_ms,
+                limit=config.remote_completion_limit,
+                cache_size=config.remote_completion_cache_size,
+                parent=self.frame
+            )
+            self.completer.path_edited.connect(self.remote_search.search)
+            self.remote_search.found.connect(self.on_remote_customers_found)
+
         self.toggle = QPushButton(icon=self.collapse_icon)
         self.toggle.setObjectName('expand_toggle')
         self.toggle.setCheckable(True)
@@ -145,10 +163,7 @@ class CustomerLayout(QVBoxLayout, VerifyInputWidget):
         """ Clear all data in input field """
         for item in self._customer_dict.values():
             item.input_widget.clear()
-            item.input_widget.setObjectName('customer_input')
-            item.error_widget.setObjectName('invisible_error_label')
-            self.set_style(item.error_widget)
-            self.set_style(item.input_widget)
+            item.validator.show(None)
 
     def get_data(self):
         """ Get all data from input fields """
@@ -159,16 +174,8 @@ class CustomerLayout(QVBoxLayout, VerifyInputWidget):
 
     def validate_all_data(self, data: dict):
         """ Validate all data before adding to table"""
-        validate_status = True
-        for key, value in data.items():
-            if key in [CustomerAttribute.NAME.value, CustomerAttribute.PHONE_NUMBER.value] or value:
-                status = self.verify_input_logic(
-                    widget_dict=self._customer_dict[CustomerAttribute(key)],
-                    data=value
-                )
-                if not status:
-                    validate_status = False
-        return validate_status
+        record = {CustomerAttribute(key): value for key, value in data.items()}
+        return self.show_validation(self._customer_dict, CUSTOMER.validate(record))
 
     def on_window_resize(self, window_w: int):
         """ resize event"""
@@ -184,32 +191,31 @@ class CustomerLayout(QVBoxLayout, VerifyInputWidget):
                 product_layout.left_field.input_widget.setFixedWidth(int(window_w * self.INVIDUAL_SCALE))
                 product_layout.left_field.error_widget.setFixedWidth(int(window_w * self.INVIDUAL_SCALE))
 
-    def create_completer(self) -> tuple[QStringListModel, QCompleter]:
-        """ Create completer for customer name and phone number """
-        model = QStringListModel()
-        completer = QCompleter()
-        completer.setModel(model)
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchContains)
-        return model, completer
-
-    def load_data_suggestion(self, data: list) -> None:
-        """ Load name and type suggestion """
-        for customer in data:
-            self.user_suggestion[customer['_id']] = customer
-        self.set_data_suggestion()
-
-    def set_data_suggestion(self) -> None:
-        """ Set name and type suggestion """
-        combined_list = [f"{data[CustomerAttribute.NAME.value]} - {phone}"
-                         for phone, data in self.user_suggestion.items()]
-        self.user_model.setStringList(combined_list)
+    @staticmethod
+    def suggestion_text(customer: dict) -> str:
+        """ Completer entry of a customer, 'name - phone' """
+        return f"{customer[CustomerAttribute.NAME.value]} - {customer[CustomerAttribute.PHONE_NUMBER.value]}"
+
+    def load_data_suggestion(self, data: list, removed_phones: list = ()) -> None:
+        """ Add or update customers and remove customers by phone number in one batch """
+        self.suggestions.apply(added=data, removed=removed_phones)
+
+    def replace_suggestions(self, suggestions: SuggestionStore) -> None:
+        """ Use a store built off the GUI thread, customers added meanwhile are carried over """
+        suggestions.apply(added=self.suggestions.records())
+        self.suggestions = suggestions
+        self.completer.index = suggestions.index
+
+    def on_remote_customers_found(self, text: str, customers: list) -> None:
+        """ Replace suggestions with the customers found for the current input """
+        self.suggestions.clear()
+        self.suggestions.apply(added=customers)
+        self.completer.show_results(text)
 
     def fill_fields(self, text):
         """Fill name and phone fields when selecting from completer"""
-        if " - " in text:
-            _, phone = text.split(" - ", 1)
-            customer_data = self.user_suggestion[phone]
+        customer_data = self.suggestions.record_of(text)
+        if customer_data is not None:
             QTimer.singleShot(0, lambda: self.customer_name_phone_layout.left_field.input_widget.setText(
                 customer_data[CustomerAttribute.NAME.value]
             ))
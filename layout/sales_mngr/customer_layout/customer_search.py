@@ -0,0 +1,123 @@
+""" Remote Customer Search Module """
+
+
+import queue
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from common.constants import CustomerAttribute
+from common.search_completer import fold_text
+
+
+class RemoteCustomerSearch(QObject):
+    """
+    Customer lookup against MongoDB while the user types.
+
+    Input is debounced, queries run one at a time on a worker thread and every new input
+    bumps a generation counter: queued queries of an older generation are dropped and their
+    late results only fill the cache. Recent results are kept in a small LRU cache, and a
+    cached shorter prefix that returned less than the query limit answers longer inputs
+    without a round trip. `found` is emitted on the GUI thread for the current input only.
+    Failed queries are not cached.
+    """
+    found = pyqtSignal(str, list)
+    _finished = pyqtSignal(int, str, object)
+
+    def __init__(self, mongodb_client, delay_ms: int, limit: int, cache_size: int, parent=None):
+        super().__init__(parent)
+        self.mongodb_client = mongodb_client
+        self.limit = limit
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, list] = OrderedDict()
+        self._generation = 0
+        self._text = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._send)
+        self._finished.connect(self._on_finished)
+
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="CustomerSearchThread", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def cache_key(text: str) -> str:
+        """ Phone digits as typed, names folded the same way the server stores them """
+        text = text.strip()
+        return text if text.isdigit() else fold_text(text)
+
+    def search(self, text: str) -> None:
+        """ Look up customers for the current input """
+        if text == self._text:
+            return
+        self._text = text
+        self._generation += 1
+        self._timer.stop()
+
+        key = self.cache_key(text)
+        if not key:
+            return
+        customers = self._cached(key)
+        if customers is not None:
+            self.found.emit(text, customers)
+            return
+        self._timer.start()
+
+    def _cached(self, key: str) -> list:
+        """ Cached result of key, or narrowed from a complete result of a shorter prefix """
+        customers = self._cache.get(key)
+        if customers is not None:
+            self._cache.move_to_end(key)
+            return customers
+
+        for length in range(len(key) - 1, 0, -1):
+            # A phone prefix never answers a name query and the other way around
+            if key[:length].isdigit() != key.isdigit():
+                continue
+            shorter = self._cache.get(key[:length])
+            if shorter is not None and len(shorter) < self.limit:
+                customers = [
+                    customer for customer in shorter
+                    if self.cache_key(self._match_text(key, customer)).startswith(key)
+                ]
+                self._store(key, customers)
+                return customers
+        return None
+
+    @staticmethod
+    def _match_text(key: str, customer: dict) -> str:
+        """ Customer field a key is matched against """
+        if key.isdigit():
+            return customer[CustomerAttribute.PHONE_NUMBER.value]
+        return customer[CustomerAttribute.NAME.value]
+
+    def _store(self, key: str, customers: list) -> None:
+        self._cache[key] = customers
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _send(self) -> None:
+        self._requests.put((self._generation, self._text))
+
+    def _run(self) -> None:
+        while True:
+            generation, text = self._requests.get()
+            if generation != self._generation:
+                # Superseded by newer input while waiting
+                continue
+            customers = self.mongodb_client.search_customers(text, self.limit)
+            self._finished.emit(generation, text, customers)
+
+    def _on_finished(self, generation: int, text: str, customers: list) -> None:
+        if customers is None:
+            # Failed query, nothing to cache; the next edit of this input asks the server again
+            customers = []
+        else:
+            self._store(self.cache_key(text), customers)
+        if generation == self._generation:
+            self.found.emit(text, customers)
@@ -0,0 +1,76 @@
+""" Cart Totals Module """
+
+
+from layout.sales_mngr.middle_layout.line_item_store import LineItem
+
+
+class Subtotal():
+    """ Aggregate of the lines sharing one unit or one product """
+    __slots__ = ('lines', 'quantity', 'amount')
+
+    def __init__(self):
+        self.lines = 0
+        self.quantity = 0
+        self.amount = 0
+
+    def to_dict(self) -> dict:
+        """ Plain dict of the aggregate """
+        return {'lines': self.lines, 'quantity': self.quantity, 'amount': self.amount}
+
+
+class CartTotals():
+    """
+    Running totals of the cart, updated in O(1) per line add, edit or delete.
+
+    Keeps the grand total, line count and subtotals by unit and by product (name, unit).
+    Groups disappear once their last line is removed.
+    """
+    def __init__(self):
+        self.grand_total = 0
+        self.line_count = 0
+        self.by_unit: dict[str, Subtotal] = {}
+        self.by_product: dict[tuple[str, str], Subtotal] = {}
+
+    def _apply(self, item: LineItem, sign: int) -> None:
+        self.grand_total += sign * item.amount
+        self.line_count += sign
+        for groups, key in ((self.by_unit, item.unit), (self.by_product, (item.name, item.unit))):
+            subtotal = groups.get(key)
+            if subtotal is None:
+                subtotal = groups[key] = Subtotal()
+            subtotal.lines += sign
+            subtotal.quantity += sign * item.quantity
+            subtotal.amount += sign * item.amount
+            if subtotal.lines == 0:
+                del groups[key]
+
+    def add(self, item: LineItem) -> None:
+        """ Count a new line """
+        self._apply(item, 1)
+
+    def remove(self, item: LineItem) -> None:
+        """ Forget a removed line """
+        self._apply(item, -1)
+
+    def replace(self, old_item: LineItem, new_item: LineItem) -> None:
+        """ Account for an edited line """
+        self._apply(old_item, -1)
+        self._apply(new_item, 1)
+
+    def clear(self) -> None:
+        """ Reset to an empty cart """
+        self.grand_total = 0
+        self.line_count = 0
+        self.by_unit = {}
+        self.by_product = {}
+
+    def to_dict(self) -> dict:
+        """ Plain dict snapshot, product keys joined as 'name - unit' """
+        return {
+            'grand_total': self.grand_total,
+            'line_count': self.line_count,
+            'by_unit': {unit: subtotal.to_dict() for unit, subtotal in self.by_unit.items()},
+            'by_product': {
+                f"{name} - {unit}": subtotal.to_dict() for (name, unit), subtotal in self.by_product.items()
+            }
+        }
@@ -0,0 +1,92 @@
+""" Line Item Store Module """
+
+
+from common.constants import TableAttribute
+from common.validation import LINE_ITEM
+
+
+class LineItem():
+    """ One cart line, numbers are kept as int so nothing is parsed back from display text """
+    __slots__ = ('name', 'quantity', 'unit', 'price')
+
+    def __init__(self, name: str, quantity: int, unit: str, price: int):
+        self.name = name
+        self.quantity = quantity
+        self.unit = unit
+        self.price = price
+
+    @property
+    def amount(self) -> int:
+        """ Line sum, quantity times unit price """
+        return self.quantity * self.price
+
+    @classmethod
+    def from_input(cls, data: dict) -> 'LineItem':
+        """ Create line item from product input validated with LINE_ITEM, keyed by TableAttribute """
+        quantity, price = TableAttribute.QUANTITY, TableAttribute.PRICE
+        return cls(
+            name=str(data[TableAttribute.NAME]),
+            quantity=int(LINE_ITEM[quantity].clean(str(data[quantity]))),
+            unit=str(data[TableAttribute.TYPE]),
+            price=int(LINE_ITEM[price].clean(str(data[price])))
+        )
+
+    def get(self, key: TableAttribute):
+        """ Value of one table column """
+        if key == TableAttribute.NAME:
+            return self.name
+        if key == TableAttribute.QUANTITY:
+            return self.quantity
+        if key == TableAttribute.TYPE:
+            return self.unit
+        if key == TableAttribute.PRICE:
+            return self.price
+        if key == TableAttribute.SUM:
+            return self.amount
+        raise KeyError(key)
+
+    def to_dict(self) -> dict:
+        """ Row keyed by TableAttribute value, as used by invoice export and input fields """
+        return {key.value: self.get(key) for key in TableAttribute}
+
+
+class LineItemStore():
+    """ Ordered line items of the cart with O(1) row access, the single source of cart data """
+    def __init__(self):
+        self._items: list[LineItem] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, row: int) -> LineItem:
+        return self._items[row]
+
+    def append(self, item: LineItem) -> int:
+        """ Add item at the end, return its row """
+        self._items.append(item)
+        return len(self._items) - 1
+
+    def extend(self, items: list[LineItem]) -> None:
+        """ Add items at the end """
+        self._items.extend(items)
+
+    def replace(self, row: int, item: LineItem) -> LineItem:
+        """ Replace item at row, return the previous one """
+        old_item = self._items[row]
+        self._items[row] = item
+        return old_item
+
+    def pop(self, row: int) -> LineItem:
+        """ Remove and return item at row """
+        return self._items.pop(row)
+
+    def clear(self) -> None:
+        """ Remove all items """
+        self._items.clear()
+
+    def to_dicts(self) -> list[dict]:
+        """ All rows keyed by TableAttribute value """
+        return [item.to_dict() for item in self._items]
@@ -1,16 +1,20 @@
 """ Input Layout Module """
 
 
-import qtawesome as qta
 from pydotdict import DotDict
 
-from PyQt5.QtCore import QStringListModel, Qt, QTimer
-from PyQt5.QtWidgets import QVBoxLayout, QPushButton, QLineEdit, QHBoxLayout, QCompleter
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QVBoxLayout, QPushButton, QLineEdit, QHBoxLayout
 
-from tools.utils import clear_format_money
+from tools.utils import clear_format_money, encode_product_id
 from common.styling import Style
 from common.custom_widget import QMoneyLineEdit, InputFieldLayout, VerifyInputWidget
-from common.constants import TableAttribute, RegexPatterns, ErrorMessage, InputMode
+from common.constants import TableAttribute, InputMode, AppIcon
+from common.icons import get_icon
+from common.search_completer import SearchCompleter
+from common.suggestion_store import SuggestionStore
+from common.validation import LINE_ITEM
+from tools.mongodb_client import SALE_COUNT_FIELD
 
 
 class ProductLayout(QVBoxLayout, VerifyInputWidget, Style):
@@ -20,29 +24,25 @@ class ProductLayout(QVBoxLayout, VerifyInputWidget, Style):
         TableAttribute.NAME: {
             'title': f'{TableAttribute.NAME.value}:',
             'input_cls': QLineEdit,
-            'pattern': RegexPatterns.LETTERS_AND_DIGITS,
-            'error_msg': ErrorMessage.ONLY_LETTER_AND_NUMBER,
+            'rule': LINE_ITEM[TableAttribute.NAME],
             'is_title': True
         },
         TableAttribute.QUANTITY: {
             'title': f'{TableAttribute.QUANTITY.value}:',
             'input_cls': QLineEdit,
-            'pattern': RegexPatterns.ONLY_DIGITS,
-            'error_msg': ErrorMessage.ONLY_NUMBER,
+            'rule': LINE_ITEM[TableAttribute.QUANTITY],
             'is_title': False
         },
         TableAttribute.TYPE: {
             'title': f'{TableAttribute.TYPE.value}:',
             'input_cls': QLineEdit,
-            'pattern': RegexPatterns.LETTERS_AND_DIGITS,
-            'error_msg': ErrorMessage.ONLY_LETTER_AND_NUMBER,
+            'rule': LINE_ITEM[TableAttribute.TYPE],
             'is_title': True
         },
         TableAttribute.PRICE: {
             'title': f'{TableAttribute.PRICE.value}:',
             'input_cls': QMoneyLineEdit,
-            'pattern': RegexPatterns.ONLY_DIGITS,
-            'error_msg': ErrorMessage.ONLY_NUMBER,
+            'rule': LINE_ITEM[TableAttribute.PRICE],
             'is_title': False
         }
     })
@@ -52,34 +52,42 @@ class ProductLayout(QVBoxLayout, VerifyInputWidget, Style):
         self.parent_view = parent_view
         self.mode = InputMode.ADD
 
-        self.name_suggestion = []
-        self.type_suggestion = []
-
         self.name_layout = InputFieldLayout(self._input_dict[TableAttribute.NAME])
-        self.name_model, self.name_compliter = self.create_completer()
+        self.name_compliter = SearchCompleter(self.name_layout.input_widget)
         self.name_layout.input_widget.setCompleter(self.name_compliter)
         self.name_compliter.activated.connect(self.fill_fields)
+        self.suggestions = SuggestionStore(
+            self.name_compliter.index,
+            key_of=self.product_id,
+            display_of=self.suggestion_text,
+            weight_of=lambda product: product.get(SALE_COUNT_FIELD, 0),
+            lookup_fields=(TableAttribute.NAME.value, TableAttribute.TYPE.value)
+        )
 
         self.quatity_layout = InputFieldLayout(self._input_dict[TableAttribute.QUANTITY])
 
         self.type_layout = InputFieldLayout(self._input_dict[TableAttribute.TYPE])
-        self.type_model, type_compliter = self.create_completer()
-        self.type_layout.input_widget.setCompleter(type_compliter)
+        self.type_compliter = SearchCompleter(self.type_layout.input_widget)
+        self.type_layout.input_widget.setCompleter(self.type_compliter)
 
         self.price_layout = InputFieldLayout(self._input_dict[TableAttribute.PRICE])
 
-        add_icon = qta.icon('fa5s.plus-circle', color='white')
-        self.add_button = QPushButton(text='Thêm', icon=add_icon)
+        self.add_button = QPushButton(text='Thêm', icon=get_icon(AppIcon.ADD))
         self.add_button.setObjectName('common_button')
         self.set_style(self.add_button)
 
-        clear_icon = qta.icon('fa5s.eraser', color='white')
-        self.clear_button = QPushButton(text='Xóa', icon=clear_icon)
+        self.clear_button = QPushButton(text='Xóa', icon=get_icon(AppIcon.ERASE))
         self.clear_button.setObjectName('common_button')
         self.set_style(self.clear_button)
 
+        self.import_button = QPushButton(text='Nhập', icon=get_icon(AppIcon.IMPORT))
+        self.import_button.setObjectName('common_button')
+        self.import_button.setToolTip("Nhập nhiều sản phẩm từ tệp CSV, TSV hoặc Excel (hoặc dán bằng Ctrl+V vào bảng)")
+        self.set_style(self.import_button)
+
         self.button_layout = QHBoxLayout()
         self.button_layout.addStretch()
+        self.button_layout.addWidget(self.import_button)
         self.button_layout.addWidget(self.add_button)
         self.button_layout.addWidget(self.clear_button)
 
@@ -93,22 +101,11 @@ class ProductLayout(QVBoxLayout, VerifyInputWidget, Style):
         self.addLayout(self.button_layout)
         self.addStretch()
 
-    def create_completer(self) -> tuple[QStringListModel, QCompleter]:
-        """ Create completer for customer name and phone number """
-        model = QStringListModel()
-        completer = QCompleter()
-        completer.setModel(model)
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchContains)
-        return model, completer
-
     def clear_all_data_input_field(self):
         """ Clear all data in input field """
         for item in self._input_dict.values():
             item.input_widget.clear()
-            item.error_widget.setObjectName('invisible_error_label')
-            self.set_style(item.error_widget)
-            self.set_style(item.input_widget)
+            item.validator.show(None)
 
     def get_data(self):
         """ Get all data from input fields """
@@ -122,11 +119,7 @@ class ProductLayout(QVBoxLayout, VerifyInputWidget, Style):
 
     def validate_all_data(self, data: dict):
         """ Validate all data before adding to table"""
-        for key, item in data.items():
-            status = self.verify_input_logic(widget_dict=self._input_dict[key], data=item)
-            if not status:
-                return False
-        return True
+        return self.show_validation(self._input_dict, LINE_ITEM.validate(data))
 
     def set_data_to_input_field(self, data: dict) -> None:
         """ Set data to input field """
@@ -136,16 +129,14 @@ class ProductLayout(QVBoxLayout, VerifyInputWidget, Style):
     def set_input_mode(self, mode: InputMode):
         """ Set input mode """
         if mode == InputMode.ADD:
-            add_icon = qta.icon('fa5s.plus-circle', color='white')
-            self.add_button.setIcon(add_icon)
+            self.add_button.setIcon(get_icon(AppIcon.ADD))
             self.add_button.setText("Thêm")
             self.add_button.clicked.disconnect()
             self.add_button.clicked.connect(self.parent_view.parent_view.events.on_add_product_clicked)
             self.parent_view.table_layout.lock_table(False)
 
         elif mode == InputMode.EDIT:
-            save_icon = qta.icon("fa5s.edit", color='white')
-            self.add_button.setIcon(save_icon)
+            self.add_button.setIcon(get_icon(AppIcon.EDIT))
             self.add_button.setText("Cập nhật")
             self.add_button.clicked.disconnect()
             self.add_button.clicked.connect(self.parent_view.parent_view.events.on_update_product_clicked)
@@ -156,35 +147,55 @@ class ProductLayout(QVBoxLayout, VerifyInputWidget, Style):
 
         self.mode = mode
 
-    def load_data_suggestion(self, data: list) -> None:
-        """ Load name and type suggestion """
-        for product in data:
-            name_str = product[TableAttribute.NAME.value]
-            type_str = product[TableAttribute.TYPE.value]
-            price_str = product[TableAttribute.PRICE.value]
-            combine_data = (name_str, price_str, type_str)
-
-            if combine_data not in self.name_suggestion:
-                self.name_suggestion.append(combine_data)
-
-            if type_str and type_str not in self.type_suggestion:
-                self.type_suggestion.append(type_str)
-
-        self.set_data_suggestion()
-
-    def set_data_suggestion(self) -> None:
-        """ Set name and type suggestion """
-        combined_list = [f"{name_str} - {price_str}"
-                         for name_str, price_str, _ in self.name_suggestion]
-        self.name_model.setStringList(combined_list)
-        self.type_model.setStringList(self.type_suggestion)
+    @staticmethod
+    def product_id(product: dict) -> str:
+        """ Product id, the same one invoices are stored with """
+        return encode_product_id(
+            product[TableAttribute.NAME.value],
+            product[TableAttribute.TYPE.value],
+            product[TableAttribute.PRICE.value]
+        )
+
+    @staticmethod
+    def suggestion_text(product: dict) -> str:
+        """ Completer entry of a product, 'name - price - type' """
+        return (f"{product[TableAttribute.NAME.value]} - {product[TableAttribute.PRICE.value]}"
+                f" - {product[TableAttribute.TYPE.value]}")
+
+    def load_data_suggestion(self, data: list, removed_ids: list = ()) -> None:
+        """ Add or update products and remove products by id in one batch """
+        types = {product[TableAttribute.TYPE.value] for product in data}
+        for product_id in removed_ids:
+            product = self.suggestions.get(product_id)
+            if product is not None:
+                types.add(product[TableAttribute.TYPE.value])
+        self.suggestions.apply(added=data, removed=removed_ids)
+
+        # Types are ranked by the number of products using them
+        for type_str in types:
+            if not type_str:
+                continue
+            product_count = self.suggestions.count(TableAttribute.TYPE.value, type_str)
+            if product_count:
+                self.type_compliter.index.add(type_str, product_count)
+            else:
+                self.type_compliter.index.discard(type_str)
+
+    def replace_suggestions(self, suggestions: SuggestionStore) -> None:
+        """ Use a store built off the GUI thread, products added meanwhile are carried over """
+        suggestions.apply(added=self.suggestions.records())
+        self.suggestions = suggestions
+        self.name_compliter.index = suggestions.index
+        self.type_compliter.index.update([
+            (type_str, suggestions.count(TableAttribute.TYPE.value, type_str))
+            for type_str in suggestions.values(TableAttribute.TYPE.value) if type_str
+        ])
 
     def fill_fields(self, text: str) -> None:
-        """ Fill fields when select suggestion """
-        name_part = text.split(" - ")[0]
-        for name_str, price_str, type_str in self.name_suggestion:
-            if name_part == name_str:
-                QTimer.singleShot(0, lambda: self.name_layout.input_widget.setText(str(name_str)))
-                QTimer.singleShot(0, lambda: self.price_layout.input_widget.setText(str(price_str)))
-                QTimer.singleShot(0, lambda: self.type_layout.input_widget.setText(str(type_str)))
-                break
+        """ Fill fields with the product of the chosen suggestion """
+        product = self.suggestions.record_of(text)
+        if product is None:
+            return
+        QTimer.singleShot(0, lambda: self.name_layout.input_widget.setText(str(product[TableAttribute.NAME.value])))
+        QTimer.singleShot(0, lambda: self.price_layout.input_widget.setText(str(product[TableAttribute.PRICE.value])))
+        QTimer.singleShot(0, lambda: self.type_layout.input_widget.setText(str(product[TableAttribute.TYPE.value])))
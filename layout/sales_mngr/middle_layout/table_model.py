@@ -0,0 +1,113 @@
+""" Line Item Table Model Module """
+
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor
+
+from common.constants import TableAttribute
+from tools.utils import format_money
+from layout.sales_mngr.middle_layout.line_item_store import LineItem, LineItemStore
+
+NUMBER_COLUMNS = (TableAttribute.QUANTITY, TableAttribute.PRICE, TableAttribute.SUM)
+ACTIVE_ROW_COLOR = QColor('#D0DDD0')
+
+
+class LineItemTableModel(QAbstractTableModel):
+    """
+    Table model of the cart line items.
+
+    Rows are read from a LineItemStore, which this model mutates. Cells are formatted when
+    the view asks for them, mutations only notify the view about the rows they touch.
+    The highlighted row is a single `active_row` served through BackgroundRole.
+    """
+    def __init__(self, line_items: LineItemStore, col_dict: dict, parent=None):
+        super().__init__(parent)
+        self.line_items = line_items
+        self.col_dict = col_dict
+        self.columns = list(TableAttribute)
+        self.active_row: int = None
+
+    def rowCount(self, parent=QModelIndex()):  # pylint: disable=invalid-name
+        """ Number of line items """
+        return 0 if parent.isValid() else len(self.line_items)
+
+    def columnCount(self, parent=QModelIndex()):  # pylint: disable=invalid-name
+        """ Number of table attributes """
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        """ Format cell value on demand """
+        if not index.isValid():
+            return None
+
+        key = self.columns[index.column()]
+        if role == Qt.DisplayRole:
+            value = self.line_items[index.row()].get(key)
+            if key in NUMBER_COLUMNS:
+                return format_money(value)
+            return str(value)
+        if role == Qt.TextAlignmentRole:
+            return int(self.col_dict[key]['align'])
+        if role == Qt.BackgroundRole:
+            return ACTIVE_ROW_COLOR if index.row() == self.active_row else None
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):  # pylint: disable=invalid-name
+        """ Column titles from TableAttribute """
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.columns[section].value
+        return super().headerData(section, orientation, role)
+
+    def append_row(self, item: LineItem) -> None:
+        """ Add one line item at the end """
+        row = len(self.line_items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.line_items.append(item)
+        self.endInsertRows()
+
+    def append_rows(self, items: list[LineItem]) -> None:
+        """ Add many line items at the end with a single insert notification """
+        if not items:
+            return
+        first_row = len(self.line_items)
+        self.beginInsertRows(QModelIndex(), first_row, first_row + len(items) - 1)
+        self.line_items.extend(items)
+        self.endInsertRows()
+
+    def set_row(self, row: int, item: LineItem) -> LineItem:
+        """ Replace one line item, return the previous one """
+        old_item = self.line_items.replace(row, item)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+        return old_item
+
+    def remove_row(self, row: int) -> LineItem:
+        """ Remove one line item and return it """
+        self.beginRemoveRows(QModelIndex(), row, row)
+        old_item = self.line_items.pop(row)
+        if self.active_row is not None:
+            if self.active_row == row:
+                self.active_row = None
+            elif self.active_row > row:
+                self.active_row -= 1
+        self.endRemoveRows()
+        return old_item
+
+    def clear(self) -> None:
+        """ Remove all line items """
+        self.beginResetModel()
+        self.line_items.clear()
+        self.active_row = None
+        self.endResetModel()
+
+    def _emit_row_background(self, row: int) -> None:
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1), [Qt.BackgroundRole])
+
+    def set_active_row(self, row: int = None) -> None:
+        """ Highlight row, None removes the highlight, only the previous and new row are repainted """
+        if row == self.active_row:
+            return
+        previous_row, self.active_row = self.active_row, row
+        if previous_row is not None:
+            self._emit_row_background(previous_row)
+        if row is not None:
+            self._emit_row_background(row)
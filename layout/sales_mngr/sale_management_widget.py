@@ -1,7 +1,12 @@
 """ Sales Management Widget Module """
 
 
-from PyQt5.QtWidgets import QVBoxLayout, QWidget
+import threading
+from datetime import datetime, timedelta, timezone
+
+from PyQt5.QtCore import QTimer, pyqtSignal, Qt
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QVBoxLayout, QWidget, QShortcut
 
 from layout.data_collectors import DataCollectors
 from layout.sales_mngr.sales_events import SalesEvents
@@ -9,11 +14,22 @@ from layout.sales_mngr.customer_layout.customer_layout import CustomerLayout
 from layout.sales_mngr.bottom_layout.bottom_layout import BottomLayout
 from layout.sales_mngr.middle_layout.middle_layout import MiddleLayout
 from common.app_context import AppContext
+from common.constants import DBCollection
 from common.styling import Style
+from tools.utils import expand_env_vars_in_path
+from tools.suggestion_snapshot import SuggestionSnapshot
 
+# Re-read a short window before the last refresh so writes landing during a read are not missed
+REFRESH_OVERLAP = timedelta(seconds=5)
+REFRESH_DELAY_MS = 500
 
 class SalesManagementWidget(QWidget, Style): # pylint:disable=R0903
     """ Sales Management widget class """
+    suggestions_loaded = pyqtSignal()
+    snapshot_loaded = pyqtSignal(object)
+    suggestion_page_loaded = pyqtSignal(object, list, bool)
+    suggestion_changes_loaded = pyqtSignal(dict)
+
     def __init__(self, context):
         super().__init__()
         self.context: AppContext = context
@@ -24,8 +40,29 @@ class SalesManagementWidget(QWidget, Style): # pylint:disable=R0903
         self.middle_layout = MiddleLayout(self)
         self.bottom_layout = BottomLayout()
 
+        # High-water mark of the last suggestion sync per collection
+        self.suggestion_synced_at = {
+            DBCollection.CUSTOMER: None,
+            DBCollection.PRODUCT: None
+        }
+        if self.customer_layout.remote_search is not None:
+            # Customers are searched on the server as the user types
+            del self.suggestion_synced_at[DBCollection.CUSTOMER]
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DELAY_MS)
+        self.refresh_timer.timeout.connect(self.refresh_suggestion_data)
+        self.loading_collections = set()
+        self.refresh_running = False
+        self.refresh_pending = False
+        self.refresh_notify = False
+        self.snapshot = SuggestionSnapshot(expand_env_vars_in_path(self.context.config.suggestion_snapshot))
+        self.snapshot_loading = False
+        self.suggestion_load_pending = False
+
         self.__init_ui()
         self.__connect_signals()
+        self.load_suggestion_snapshot()
 
     def __init_ui(self):
         self.sale_management_layout = QVBoxLayout()
@@ -39,17 +76,219 @@ class SalesManagementWidget(QWidget, Style): # pylint:disable=R0903
         self.middle_layout.product_layout.add_button.clicked.connect(self.events.on_add_product_clicked)
         self.middle_layout.product_layout.clear_button.clicked.connect(self.events.on_clear_product_clicked)
         self.middle_layout.table_layout.table_widget.doubleClicked.connect(self.events.on_table_clicked)
+        self.middle_layout.product_layout.import_button.clicked.connect(self.events.on_import_products_clicked)
+        self.paste_shortcut = QShortcut(QKeySequence.Paste, self.middle_layout.table_layout.table_widget)
+        self.paste_shortcut.setContext(Qt.WidgetShortcut)
+        self.paste_shortcut.activated.connect(self.events.on_paste_products)
         self.bottom_layout.export_button.clicked.connect(self.events.on_export_button_clicked)
+        self.bottom_layout.cancel_export_button.clicked.connect(self.events.on_cancel_export_clicked)
+        self.events.exporter.progress.connect(self.events.on_export_progress)
+        self.events.exporter.finished.connect(self.events.on_export_finished)
+        self.events.exporter.failed.connect(self.events.on_export_failed)
+        self.events.exporter.cancelled.connect(self.events.on_export_cancelled)
+        self.context.mongodb_client.write_queue.write_failed.connect(self.on_write_failed)
+        self.context.mongodb_client.write_queue.write_finished.connect(self.on_write_finished)
+        self.snapshot_loaded.connect(self.on_snapshot_loaded)
+        self.suggestion_page_loaded.connect(self.on_suggestion_page_loaded)
+        self.suggestion_changes_loaded.connect(self.on_suggestion_changes_loaded)
+
+    def on_write_failed(self, job) -> None:
+        """ Handle background database write failure on GUI thread """
+        self.data_collectors.on_write_failed(job)
+
+    def on_write_finished(self, job) -> None:
+        """ Schedule a suggestion refresh once background writes settle """
+        self.data_collectors.on_write_finished(job)
+        self.refresh_timer.start()
+
+    def load_suggestion_snapshot(self) -> None:
+        """
+        Fill completers from the local snapshot so they work before the database is up.
+        Parsing and indexing run on a worker thread into new stores, `on_snapshot_loaded`
+        swaps them in on the GUI thread.
+        """
+        customers = None
+        if self.customer_layout.remote_search is None:
+            customers = self.customer_layout.suggestions.empty_copy()
+        products = self.middle_layout.product_layout.suggestions.empty_copy()
+
+        self.snapshot_loading = True
+        snapshot_thread = threading.Thread(
+            target=self._build_snapshot_suggestions,
+            args=(customers, products),
+            name="SnapshotLoadThread",
+            daemon=True
+        )
+        snapshot_thread.start()
+
+    def _build_snapshot_suggestions(self, customers, products) -> None:
+        """ Worker thread, index the snapshot into stores the completers do not use yet """
+        result = None
+        try:
+            snapshot = self.snapshot.load()
+            if snapshot is not None:
+                synced_at, customer_docs, product_docs = snapshot
+                if customers is not None:
+                    customers.apply(added=customer_docs)
+                products.apply(added=product_docs)
+                result = (synced_at, customers, bool(customer_docs), products)
+        except Exception as err: # pylint: disable=broad-exception-caught
+            print(f"[ERROR] Failed to build suggestions from snapshot: {err}")
+        self.snapshot_loaded.emit(result)
+
+    def on_snapshot_loaded(self, result) -> None:
+        """ Swap in the stores built from the snapshot, then run a database load that waited for them """
+        self.snapshot_loading = False
+        if result is not None:
+            synced_at, customers, has_customers, products = result
+            if customers is not None:
+                self.customer_layout.replace_suggestions(customers)
+            self.middle_layout.product_layout.replace_suggestions(products)
+            for collection_type in self.suggestion_synced_at:
+                self.suggestion_synced_at[collection_type] = synced_at
+            if not has_customers and DBCollection.CUSTOMER in self.suggestion_synced_at:
+                # Snapshot written in remote completion mode has no customers, load them all
+                self.suggestion_synced_at[DBCollection.CUSTOMER] = None
+
+        if self.suggestion_load_pending:
+            self.suggestion_load_pending = False
+            self.load_suggesion_data()
+
+    def save_suggestion_snapshot(self) -> None:
+        """ Write current suggestion data to the local snapshot on a background thread """
+        if None in self.suggestion_synced_at.values():
+            # A collection is not fully loaded yet, its partial data must not be saved as synced
+            return
+        synced_at = min(self.suggestion_synced_at.values())
+        customers = self.customer_layout.suggestions.records() if self.customer_layout.remote_search is None else []
+        products = self.middle_layout.product_layout.suggestions.records()
+        self.snapshot.save_in_background(synced_at, customers, products)
 
     def load_suggesion_data(self, status: str = None) -> None:   # pylint: disable=unused-argument
         """ Load suggestion data """
+        if self.snapshot_loading:
+            # Loaded once the snapshot is in the completers, it must not replace newer data
+            self.suggestion_load_pending = True
+            return
+
         self.data_collectors.upload_local_data()
+        if None not in self.suggestion_synced_at.values():
+            # Completers are already filled from the snapshot, only reconcile what changed since
+            self.refresh_notify = True
+            self.refresh_suggestion_data()
+            return
+
+        self.loading_collections = set(self.suggestion_synced_at)
+        for collection_type in self.suggestion_synced_at:
+            self.suggestion_synced_at[collection_type] = datetime.now(timezone.utc)
+            page_thread = threading.Thread(
+                target=self._fetch_suggestion_pages,
+                args=(collection_type,),
+                name=f"SuggestionLoadThread-{collection_type.name.lower()}",
+                daemon=True
+            )
+            page_thread.start()
+
+    def refresh_suggestion_data(self) -> None:
+        """
+        Load only customers and products written since the last sync. The query runs on a
+        worker thread, `on_suggestion_changes_loaded` merges the result on the GUI thread.
+        """
+        if self.refresh_running:
+            # Run again once the current refresh is merged, it may have missed the latest writes
+            self.refresh_pending = True
+            return
+        if not self.context.mongodb_client.is_connected:
+            if self.refresh_notify:
+                self.refresh_notify = False
+                self.suggestions_loaded.emit()
+            return
+
+        since = {}
+        for collection_type, synced_at in self.suggestion_synced_at.items():
+            if synced_at is None:
+                # Full load has not run yet
+                continue
+            self.suggestion_synced_at[collection_type] = datetime.now(timezone.utc)
+            since[collection_type] = synced_at - REFRESH_OVERLAP
+
+        self.refresh_running = True
+        refresh_thread = threading.Thread(
+            target=self._fetch_suggestion_changes,
+            args=(since,),
+            name="SuggestionRefreshThread",
+            daemon=True
+        )
+        refresh_thread.start()
+
+    def _fetch_suggestion_changes(self, since: dict) -> None:
+        """ Worker thread, read documents written since the given time per collection """
+        changes = {}
+        for collection_type, collection_since in since.items():
+            try:
+                if collection_type == DBCollection.CUSTOMER:
+                    documents = self.context.mongodb_client.iter_customer_info(since=collection_since)
+                else:
+                    documents = self.context.mongodb_client.iter_product_info(since=collection_since)
+                changes[collection_type] = list(documents)
+            except Exception as err: # pylint: disable=broad-exception-caught
+                print(f"[ERROR] Failed to refresh {collection_type.name.lower()} suggestions: {err}")
+        self.suggestion_changes_loaded.emit(changes)
+
+    def on_suggestion_changes_loaded(self, changes: dict) -> None:
+        """ Merge the documents read by `_fetch_suggestion_changes` into the completers """
+        self.refresh_running = False
+        customers = changes.get(DBCollection.CUSTOMER)
+        if customers:
+            self.customer_layout.load_data_suggestion(customers)
+        products = changes.get(DBCollection.PRODUCT)
+        if products:
+            self.middle_layout.product_layout.load_data_suggestion(products)
+        if customers or products:
+            self.save_suggestion_snapshot()
+
+        if self.refresh_pending:
+            self.refresh_pending = False
+            self.refresh_suggestion_data()
+        elif self.refresh_notify:
+            self.refresh_notify = False
+            self.suggestions_loaded.emit()
+
+    def _fetch_suggestion_pages(self, collection_type: DBCollection) -> None:
+        """
+        Worker thread, read the collection page by page. Each page is handed to
+        `on_suggestion_page_loaded` on the GUI thread, the last one with done set.
+        """
+        mongodb_client = self.context.mongodb_client
+        get_page = mongodb_client.get_customer_page if collection_type == DBCollection.CUSTOMER \
+            else mongodb_client.get_product_page
+        after_id = None
+        while True:
+            try:
+                page = get_page(after_id)
+            except Exception as err: # pylint: disable=broad-exception-caught
+                print(f"[ERROR] Failed to load {collection_type.name.lower()} suggestions: {err}")
+                page = []
+            done = len(page) < mongodb_client.config.suggestion_page_size
+            self.suggestion_page_loaded.emit(collection_type, page, done)
+            if done:
+                return
+            after_id = page[-1]['_id']
 
-        customers_data = self.context.mongodb_client.get_customer_info()
-        self.customer_layout.load_data_suggestion(customers_data)
+    def on_suggestion_page_loaded(self, collection_type: DBCollection, page: list, done: bool) -> None:
+        """ Add one page read by `_fetch_suggestion_pages` to the completers """
+        if page:
+            if collection_type == DBCollection.CUSTOMER:
+                self.customer_layout.load_data_suggestion(page)
+            else:
+                self.middle_layout.product_layout.load_data_suggestion(page)
+        if not done:
+            return
 
-        products_data = self.context.mongodb_client.get_product_info()
-        self.middle_layout.product_layout.load_data_suggestion(products_data)
+        self.loading_collections.discard(collection_type)
+        if not self.loading_collections:
+            self.save_suggestion_snapshot()
+            self.suggestions_loaded.emit()
 
     def handle_resize(self, width):
         """ Handle resize event """
@@ -5,11 +5,16 @@ import os
 
 from PyQt5.QtCore import QUrl
 from PyQt5.QtGui import QDesktopServices
+from PyQt5.QtWidgets import QApplication, QFileDialog
 
-from tools.invoice_builder import InvoiceBuilder
 from common.app_context import AppContext
 from common.custom_widget import MessageBoxWidget
-from common.constants import InputMode, MessageBoxType
+from common.constants import InputMode, MessageBoxType, ExportStage
+from tools.line_item_import import parse_delimited, read_rows, validate_rows
+from tools.invoice_export import InvoiceExporter, InvoiceSnapshot
+
+# Errors listed in the import report, the rest are only counted
+MAX_REPORTED_ERRORS = 15
 
 
 class SalesEvents():
@@ -18,7 +23,9 @@ class SalesEvents():
         self.parent_view = parent_view
         self.context: AppContext = parent_view.context
         self.edit_row = None
-        self.invoice_builder = InvoiceBuilder(self.context)
+        self.exporter = InvoiceExporter(self.context)
+        # Export result boxes shown without blocking the next sale
+        self._notices: list[MessageBoxWidget] = []
 
     def on_clear_customer_clicked(self):
         """ Event press clear button on top layout """
@@ -82,12 +89,58 @@ class SalesEvents():
             self.parent_view.middle_layout.table_layout.clean_table_color()
             self.parent_view.middle_layout.product_layout.set_input_mode(mode=InputMode.ADD)
 
+    def on_import_products_clicked(self):
+        """ Event press import button, add products from a CSV/TSV or xlsx file """
+        path, _ = QFileDialog.getOpenFileName(
+            None, "Chọn tệp sản phẩm", "", "Bảng tính (*.xlsx *.xlsm *.csv *.tsv *.txt)"
+        )
+        if not path:
+            return
+
+        try:
+            # Rows are read while they are validated, read errors surface here as well
+            valid_rows, errors = validate_rows(read_rows(path))
+        except Exception as err: # pylint: disable=broad-exception-caught
+            error_box = MessageBoxWidget(MessageBoxType.ERROR, "Nhập sản phẩm thất bại", f"Không đọc được tệp: {err}")
+            error_box.exec_()
+            return
+        self._add_imported_rows(valid_rows, errors)
+
+    def on_paste_products(self):
+        """ Event Ctrl+V on table, add products from copied spreadsheet cells """
+        text = QApplication.clipboard().text()
+        if text.strip():
+            self._add_imported_rows(*validate_rows(parse_delimited(text)))
+
+    def _add_imported_rows(self, valid_rows: list, errors: list):
+        """ Report errors of validated imported rows and add the valid rows in one batch """
+        if errors:
+            lines = [str(error) for error in errors[:MAX_REPORTED_ERRORS]]
+            if len(errors) > MAX_REPORTED_ERRORS:
+                lines.append(f"... và {len(errors) - MAX_REPORTED_ERRORS} lỗi khác")
+            report = "\n".join(lines)
+
+            if not valid_rows:
+                warning_box = MessageBoxWidget(
+                    MessageBoxType.WARNING, "Nhập sản phẩm thất bại", f"Không có dòng hợp lệ:\n{report}"
+                )
+                warning_box.exec_()
+                return
+
+            question_box = MessageBoxWidget(
+                MessageBoxType.QUESTION,
+                "Nhập sản phẩm",
+                f"Có {len(errors)} lỗi:\n{report}\n\nBạn có muốn thêm {len(valid_rows)} dòng hợp lệ?"
+            )
+            question_box.exec_()
+            if question_box.clickedButton() == question_box.button_reject:
+                return
+
+        self.parent_view.middle_layout.table_layout.add_rows_to_table(valid_rows)
+
     def on_table_clicked(self):
         """ Event double click on table """
-        # Clear previous highlight
-        self.parent_view.middle_layout.table_layout.clean_table_color()
-
-        # Get current selected cell
+        # Get current selected cell, highlighting it replaces the previous highlight
         self.edit_row, edit_col = self.parent_view.middle_layout.table_layout.get_current_cell()
         self.parent_view.middle_layout.table_layout.highlight_edit_row(self.edit_row, edit_col)
 
@@ -112,36 +165,68 @@ class SalesEvents():
         customer_id, customer_data = self.parent_view.data_collectors.collect_customer_data()
         if not customer_data:
             return
-        invoice_id, invoice_data = self.parent_view.data_collectors.collect_invoice_data(customer_id)
+        invoice_id, invoice_data = self.parent_view.data_collectors.collect_invoice_data(customer_id, customer_data)
         if not invoice_data:
             return
-        self.parent_view.load_suggesion_data()
 
-        # Build invoice
-        try:
-            pdf_path = self.invoice_builder.build(invoice_id, invoice_data, customer_data)
-        except Exception as err: # pylint: disable=broad-exception-caught
-            error_box = MessageBoxWidget(
-                MessageBoxType.ERROR,
-                "Xuất hóa đơn thất bại",
-                f"Lỗi khi xuất hóa đơn: {err}"
-            )
-            error_box.exec_()
-            return
+        # Export in background from a snapshot, the next sale can start right away
+        totals = self.parent_view.middle_layout.table_layout.totals.to_dict()
+        self.exporter.submit(InvoiceSnapshot(invoice_id, invoice_data, customer_data, totals))
 
-        # Show success message
+        # Clear data on table and input field
+        self.parent_view.middle_layout.table_layout.clean_table()
+        self.parent_view.customer_layout.clear_all_data_input_field()
+
+    def on_cancel_export_clicked(self):
+        """ Event clicked on cancel export button, cancel the export shown in progress """
+        job_id = self.exporter.current()
+        if job_id is not None:
+            self.exporter.cancel(job_id)
+
+    def on_export_progress(self, job_id: str, stage: ExportStage):
+        """ Show stage of the running export, with the number of exports waiting behind it """
+        text = f"{job_id}: {stage.description}"
+        waiting = len(self.exporter) - 1
+        if waiting > 0:
+            text += f" (+{waiting} chờ xuất)"
+        self.parent_view.bottom_layout.show_export_progress(text, stage.percent)
+
+    def on_export_finished(self, job_id: str, pdf_path: str):
+        """ Export finished in background, notify without blocking the current sale """
+        self._update_export_progress()
         info_box = MessageBoxWidget(
             MessageBoxType.INFO,
             "Xuất hóa đơn thành công",
-            f'Hóa đơn được lưu tại:\n{os.path.abspath(pdf_path)}'
+            f'Hóa đơn {job_id} được lưu tại:\n{os.path.abspath(pdf_path)}'
         )
         info_box.button_accept.clicked.connect(
             lambda: QDesktopServices.openUrl(
                 QUrl.fromLocalFile(os.path.abspath(pdf_path))
             )
         )
-        info_box.exec_()
-
-        # Clear data on table and input field
-        self.parent_view.middle_layout.table_layout.clean_table()
-        self.parent_view.customer_layout.clear_all_data_input_field()
+        self._show_notice(info_box)
+
+    def on_export_failed(self, job_id: str, error: str):
+        """ Export failed in background, the sale itself is already saved """
+        self._update_export_progress()
+        error_box = MessageBoxWidget(
+            MessageBoxType.ERROR,
+            "Xuất hóa đơn thất bại",
+            f"Lỗi khi xuất hóa đơn {job_id}: {error}"
+        )
+        self._show_notice(error_box)
+
+    def on_export_cancelled(self, job_id: str):   # pylint: disable=unused-argument
+        """ Export cancelled, the sale itself is already saved """
+        self._update_export_progress()
+
+    def _update_export_progress(self):
+        if not len(self.exporter):
+            self.parent_view.bottom_layout.hide_export_progress()
+
+    def _show_notice(self, message_box: MessageBoxWidget):
+        """ Show message box non-modal, keep it alive until closed """
+        self._notices.append(message_box)
+        message_box.finished.connect(lambda _: self._notices.remove(message_box))
+        message_box.setModal(False)
+        message_box.show()
@@ -3,20 +3,36 @@
 
 import sys
 
+from tools import import_profiler
+if import_profiler.ENABLED:
+    import_profiler.install()
+
+# pylint: disable=wrong-import-position
 from PyQt5.QtWidgets import QApplication
 
 
 from main_window import MainWindow
 from common.app_context import AppContext
+from common.styling import install_stylesheet
+from common.icons import prewarm
 from common.loading_widget import LoadingWidget
 
 if __name__ == "__main__":
     AppContext.generate_user_data()
     app = QApplication(sys.argv)
+    install_stylesheet(app)
+    prewarm()
     context = AppContext()
     loading_widget = LoadingWidget(context=context)
     window = MainWindow(context=context)
 
-    loading_widget.start_loading(window.show)
+    def on_loaded():
+        """ Show main window, then load export modules in background """
+        window.show()
+        if import_profiler.ENABLED:
+            import_profiler.print_report()
+        import_profiler.warm_up()
+
+    loading_widget.start_loading(on_loaded)
 
     sys.exit(app.exec_())
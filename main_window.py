@@ -1,15 +1,16 @@
 """ Main Window module """
 
 
-import qtawesome as qta
-
-from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel
 
 from layout.main_tab_widget import MainTabWidget
 from layout.menu_bar.menu_bar import MenuBar
 from layout.events import Events
-from common.constants import MongoDBStatus
+from common.constants import MongoDBStatus, StartupStage, AppIcon
+from common.icons import get_icon
 
+DB_STATS_INTERVAL_MS = 2000
 
 class MainWindow(QMainWindow): # pylint:disable=R0903
     """ Main Window class """
@@ -24,6 +25,7 @@ class MainWindow(QMainWindow): # pylint:disable=R0903
 
         self.context.mongodb_client.finish_signal.connect(self.__change_status_bar)
         self.context.mongodb_client.finish_signal.connect(self.tab_widget.sales_management_tab.load_suggesion_data)
+        self.tab_widget.sales_management_tab.suggestions_loaded.connect(self.__on_suggestions_loaded)
 
         self.__init_ui()
 
@@ -36,10 +38,16 @@ class MainWindow(QMainWindow): # pylint:disable=R0903
         self.setCentralWidget(central_widget)
         self.__change_status_bar(MongoDBStatus.UNKNOWN.value)
 
+        self.db_stats_label = QLabel()
+        self.statusBar().addPermanentWidget(self.db_stats_label)
+        self.db_stats_timer = QTimer(self)
+        self.db_stats_timer.timeout.connect(self.__update_db_stats)
+        self.db_stats_timer.start(DB_STATS_INTERVAL_MS)
+
         self.main_layout.addWidget(self.tab_widget)
 
     def __config_window(self):
-        app_icon = qta.icon('ph.table', color='green')
+        app_icon = get_icon(AppIcon.APP)
         self.setWindowTitle("App")
         self.setWindowIcon(app_icon)
         self.setGeometry(0, 0, 1500, 700)
@@ -47,6 +55,18 @@ class MainWindow(QMainWindow): # pylint:disable=R0903
     def __change_status_bar(self, status: str) -> None:
         self.statusBar().showMessage(f"MongoDB: {status}")
 
+    def __on_suggestions_loaded(self) -> None:
+        self.__change_status_bar(
+            f"{MongoDBStatus.CONNECTED.value} - {StartupStage.SUGGESTIONS_LOADED.description}"
+        )
+
+    def __update_db_stats(self) -> None:
+        total = self.context.mongodb_client.monitor.snapshot()['total']
+        pending = self.context.mongodb_client.write_queue.depth()
+        self.db_stats_label.setText(
+            f"Lệnh DB: {total['count']} | p95: {total['p95']:.0f} ms | Chờ ghi: {pending}"
+        )
+
     def closeEvent(self, event):    # pylint: disable=invalid-name
         """ Event close app """
         self.events.handle_close(event)
@@ -0,0 +1,217 @@
+"""
+Benchmarks for performance sensitive paths of the application.
+
+Usage:
+    python -m tools.benchmark db [--count N]
+    python -m tools.benchmark style [--count N]
+    python -m tools.benchmark invoice [--count N] [--rows N]
+
+Requires the same environment variables as main.py (CONFIG_DIR, ...).
+Database benchmarks write to a scratch `invoice_app_benchmark` database which is dropped afterwards.
+Invoice benchmarks write to a temporary export folder which is removed afterwards.
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+from pydotdict import DotDict
+from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtWidgets import QApplication, QWidget, QLineEdit, QLabel, QVBoxLayout
+
+from common.constants import DBCollection, RegexPatterns, ErrorMessage, TableAttribute, CustomerAttribute
+from common.styling import STYLES, install_stylesheet
+from common.custom_widget import InputFieldLayout
+from common.validation import LINE_ITEM
+from tools.db_monitor import LatencyHistogram
+from tools.mongodb_client import MongoDBClient, CONFIG_DIR
+from tools.utils import load_json
+from tools.invoice_export import InvoiceSnapshot, run_export_stage
+
+BENCHMARK_DATABASE = "invoice_app_benchmark"
+
+
+def _print_table(title: str, rows: dict) -> None:
+    width = max(40, *(len(name) + 2 for name in rows))
+    print(f"\n{title}")
+    print(f"{'name':<{width}}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, stats in rows.items():
+        print(f"{name:<{width}}{stats['count']:>8}{stats['p50']:>10.2f}{stats['p95']:>10.2f}"
+              f"{stats['p99']:>10.2f}{stats['max']:>10.2f}")
+
+
+def bench_database(count: int) -> None:
+    """ Time single upserts, bulk upserts and paged reads, report command latencies in ms """
+    _app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    db = MongoDBClient()
+    if not db.check_connection():
+        print("[ERROR] Can not connect to MongoDB")
+        return
+
+    db.client.drop_database(BENCHMARK_DATABASE)
+    scratch = db.client[BENCHMARK_DATABASE]
+    db.collections = {collection: scratch[collection.name.lower()] for collection in DBCollection}
+    docs = [{'_id': f"P{index:08d}", 'name': f"Product {index}", 'price': index} for index in range(count)]
+
+    try:
+        db.monitor.reset()
+        start = time.perf_counter()
+        for doc in docs:
+            db.upsert_document(doc, DBCollection.PRODUCT)
+        print(f"upsert_document x{count}: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        db.bulk_upsert(docs, DBCollection.PRODUCT)
+        print(f"bulk_upsert x{count}: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        read = sum(1 for _ in db.iter_documents(DBCollection.PRODUCT))
+        print(f"iter_documents ({read} docs): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        snapshot = db.monitor.snapshot()
+        _print_table("Command latency (ms)", {'total': snapshot['total'], **snapshot['commands']})
+    finally:
+        db.write_queue.stop()
+        db.client.drop_database(BENCHMARK_DATABASE)
+        db.disconnect_client()
+
+
+def _time_keystrokes(app: QApplication, line_edit: QLineEdit, texts: list, validate=None) -> dict:
+    histogram = LatencyHistogram(size=len(texts))
+    for text in texts:
+        start = time.perf_counter()
+        line_edit.setText(text)
+        if validate is not None:
+            validate()
+        app.processEvents()
+        histogram.add((time.perf_counter() - start) * 1000)
+    return histogram.snapshot()
+
+
+def bench_style(count: int) -> None:
+    """ Per keystroke validation styling cost: per-widget setStyleSheet vs application style sheet state """
+    app = QApplication.instance() or QApplication(sys.argv)
+    scenarios = {
+        'valid typing': [str(10 ** (index % 9)) for index in range(count)],
+        'valid/invalid toggling': [f"{index}" if index % 2 else f"{index}a" for index in range(count)]
+    }
+    rows = {}
+
+    # Old behaviour: every keystroke flips objectName and re-parses a per-widget style sheet
+    legacy_input, legacy_error = QLineEdit(), QLabel()
+
+    def on_legacy_text_changed(text):
+        valid = re.fullmatch(RegexPatterns.ONLY_DIGITS.value, text)
+        legacy_error.setText("" if valid else ErrorMessage.ONLY_NUMBER.value)
+        legacy_input.setObjectName('' if valid else 'error_input')
+        legacy_error.setObjectName('invisible_error_label' if valid else 'visible_error_label')
+        legacy_input.setStyleSheet(STYLES['QLineEdit'])
+        legacy_error.setStyleSheet(STYLES['QLabel'])
+
+    legacy_input.textChanged.connect(on_legacy_text_changed)
+    legacy_container = QWidget()
+    legacy_layout = QVBoxLayout(legacy_container)
+    legacy_layout.addWidget(legacy_input)
+    legacy_layout.addWidget(legacy_error)
+    legacy_container.show()
+    for name, texts in scenarios.items():
+        rows[f"per-widget style sheet, {name}"] = _time_keystrokes(app, legacy_input, texts)
+    legacy_container.close()
+
+    # Current behaviour: one application style sheet, state property re-polished on change only
+    install_stylesheet(app)
+    field = InputFieldLayout(DotDict({
+        'title': 'Số lượng:',
+        'input_cls': QLineEdit,
+        'rule': LINE_ITEM[TableAttribute.QUANTITY],
+        'is_title': False
+    }))
+    container = QWidget()
+    container.setLayout(field)
+    container.show()
+    for name, texts in scenarios.items():
+        # Validation is debounced while typing, run it on every keystroke to time the worst case
+        rows[f"app style sheet, {name}"] = _time_keystrokes(
+            app, field.input_widget, texts, validate=field.validator.validate_input
+        )
+    container.close()
+
+    _print_table("Keystroke latency (ms)", rows)
+
+
+def bench_invoice(count: int, rows: int) -> None:
+    """ Invoice export latency per stage: xlsx converted by Spire vs the native pdf renderer """
+    # pylint: disable=import-outside-toplevel
+    from tools.invoice_builder import InvoiceBuilder
+    from tools.pdf_renderer import PdfInvoiceRenderer
+
+    # QPdfWriter text layout needs a GUI application
+    app = QApplication.instance() or QApplication(sys.argv) # pylint: disable=unused-variable
+    export_folder = tempfile.mkdtemp(prefix="invoice_benchmark_")
+    config = load_json(os.path.join(CONFIG_DIR, 'config.json'))
+    config.export_folder = export_folder
+    context = DotDict({'config': config})
+
+    invoice_data = [{
+        TableAttribute.NAME.value: f"Sản Phẩm {index}",
+        TableAttribute.QUANTITY.value: index % 9 + 1,
+        TableAttribute.TYPE.value: "Thùng",
+        TableAttribute.PRICE.value: (index % 50 + 1) * 1000,
+        TableAttribute.SUM.value: (index % 9 + 1) * (index % 50 + 1) * 1000
+    } for index in range(rows)]
+    customer_data = {attribute.value: "" for attribute in CustomerAttribute}
+    customer_data[CustomerAttribute.NAME.value] = "Nguyễn Văn A"
+    customer_data[CustomerAttribute.PHONE_NUMBER.value] = "0912345678"
+    totals = {'grand_total': sum(item[TableAttribute.SUM.value] for item in invoice_data)}
+
+    results = {}
+    try:
+        for name, builder_cls in (("xlsx + spire", InvoiceBuilder), ("native pdf", PdfInvoiceRenderer)):
+            builder = builder_cls(context)
+            histograms = {stage: LatencyHistogram(size=count) for stage in builder.EXPORT_STAGES}
+            total = LatencyHistogram(size=count)
+            try:
+                for index in range(count):
+                    snapshot = InvoiceSnapshot(f"invoice_benchmark_{index}", invoice_data, customer_data, totals)
+                    path, started = None, time.perf_counter()
+                    for stage in builder.EXPORT_STAGES:
+                        start = time.perf_counter()
+                        path = run_export_stage(builder, stage, snapshot, path)
+                        histograms[stage].add((time.perf_counter() - start) * 1000)
+                    total.add((time.perf_counter() - started) * 1000)
+            except Exception as err: # pylint: disable=broad-exception-caught
+                print(f"[ERROR] {name} export failed: {err}")
+            # Stages finished before a failure are still reported
+            named = {stage.name.lower(): histogram for stage, histogram in histograms.items()}
+            named['total'] = total
+            for stage_name, histogram in named.items():
+                if histogram.count:
+                    results[f"{name}, {stage_name}"] = histogram.snapshot()
+    finally:
+        shutil.rmtree(export_folder, ignore_errors=True)
+
+    if results:
+        _print_table(f"Invoice export latency, {rows} rows (ms)", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    db_parser = subparsers.add_parser("db", help="database write and read latency")
+    db_parser.add_argument("--count", type=int, default=1000)
+    style_parser = subparsers.add_parser("style", help="per keystroke validation styling cost")
+    style_parser.add_argument("--count", type=int, default=500)
+    invoice_parser = subparsers.add_parser("invoice", help="invoice export latency per renderer")
+    invoice_parser.add_argument("--count", type=int, default=20)
+    invoice_parser.add_argument("--rows", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.benchmark == "db":
+        bench_database(args.count)
+    elif args.benchmark == "style":
+        bench_style(args.count)
+    elif args.benchmark == "invoice":
+        bench_invoice(args.count, args.rows)
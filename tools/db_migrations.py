@@ -0,0 +1,132 @@
+""" Database index and schema migration module """
+
+
+from datetime import datetime, timezone
+
+from pydotdict import DotDict
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, UpdateOne
+
+from common.constants import DBCollection, CustomerAttribute, TableAttribute
+from common.search_completer import fold_text
+
+SCHEMA_DOC_ID = "schema"
+# Customer name without diacritics in lower case, prefix-searched by remote customer completion
+SEARCH_NAME_FIELD = "search_name"
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_customer_search_name(collections: dict) -> None:
+    """ Store the folded name of every customer written before search_name existed """
+    customers = collections[DBCollection.CUSTOMER]
+    name_key = CustomerAttribute.NAME.value
+    requests = []
+    for customer in customers.find({SEARCH_NAME_FIELD: {'$exists': False}}, {name_key: 1}):
+        requests.append(UpdateOne(
+            {'_id': customer['_id']},
+            {'$set': {SEARCH_NAME_FIELD: fold_text(customer.get(name_key) or "")}}
+        ))
+        if len(requests) == BACKFILL_BATCH_SIZE:
+            customers.bulk_write(requests, ordered=False)
+            requests = []
+    if requests:
+        customers.bulk_write(requests, ordered=False)
+
+
+# Ordered list of schema versions. Indexes of every version are always ensured on connect,
+# `upgrade` (optional callable taking the collections dict) runs once when moving to that version.
+MIGRATIONS = [
+    DotDict({
+        'version': 1,
+        'indexes': {
+            DBCollection.INVOICE: [
+                IndexModel([("customer_id", ASCENDING)], name="customer_id"),
+                IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+                IndexModel(
+                    [("customer_id", ASCENDING), ("updated_at", DESCENDING)],
+                    name="customer_id_updated_at"
+                ),
+            ],
+            DBCollection.CUSTOMER: [
+                IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+                IndexModel([(CustomerAttribute.NAME.value, ASCENDING)], name="name"),
+            ],
+            DBCollection.PRODUCT: [
+                IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+                IndexModel(
+                    [(TableAttribute.NAME.value, ASCENDING), (TableAttribute.TYPE.value, ASCENDING)],
+                    name="name_type"
+                ),
+                # Vietnamese has no stemmer, index words as typed
+                IndexModel([(TableAttribute.NAME.value, TEXT)], name="name_text", default_language="none"),
+            ],
+        },
+        'upgrade': None
+    }),
+    DotDict({
+        'version': 2,
+        'indexes': {
+            DBCollection.CUSTOMER: [
+                IndexModel([(SEARCH_NAME_FIELD, ASCENDING)], name="search_name"),
+            ],
+        },
+        'upgrade': backfill_customer_search_name
+    }),
+]
+
+
+class MigrationManager():
+    """ Create required indexes and bring the database schema to the latest version """
+    def __init__(self, collections: dict):
+        self.collections = collections
+        self.metadata = collections[DBCollection.METADATA]
+
+    @property
+    def latest_version(self) -> int:
+        """ Schema version after all migrations are applied """
+        return MIGRATIONS[-1].version
+
+    def current_version(self) -> int:
+        """ Schema version recorded in metadata collection, 0 for a new database """
+        schema = self.metadata.find_one({'_id': SCHEMA_DOC_ID})
+        return schema['version'] if schema else 0
+
+    def run(self) -> DotDict:
+        """
+        Apply pending migrations and ensure all indexes exist.
+
+        Safe to call on every connect: existing indexes are left untouched and
+        upgrade steps only run for versions newer than the recorded one.
+        Returns a report with the version change and the indexes that were built.
+        """
+        from_version = self.current_version()
+        report = DotDict({
+            'from_version': from_version,
+            'to_version': from_version,
+            'built': []
+        })
+
+        for migration in MIGRATIONS:
+            report.built.extend(self._ensure_indexes(migration.indexes))
+            if migration.version <= from_version:
+                continue
+
+            if migration.upgrade:
+                migration.upgrade(self.collections)
+            self.metadata.update_one(
+                {'_id': SCHEMA_DOC_ID},
+                {'$set': {'version': migration.version, 'applied_at': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            report.to_version = migration.version
+
+        return report
+
+    def _ensure_indexes(self, indexes: dict) -> list[str]:
+        """ Create indexes, return `collection.index` names that did not exist before """
+        built = []
+        for collection_type, models in indexes.items():
+            collection = self.collections[collection_type]
+            existing = set(collection.index_information())
+            names = collection.create_indexes(models)
+            built.extend(f"{collection.name}.{name}" for name in names if name not in existing)
+        return built
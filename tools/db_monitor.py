@@ -0,0 +1,119 @@
+""" MongoDB command latency monitoring module """
+
+
+import threading
+from datetime import datetime
+from collections import deque
+
+from pymongo import monitoring
+
+HISTORY_SIZE = 1000
+DATABASE_LEVEL = "-"
+
+
+class LatencyHistogram():
+    """ Rolling window of command latencies with total counters """
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.failures = 0
+
+    def add(self, duration_ms: float, failed: bool = False) -> None:
+        """ Record one command duration """
+        self.samples.append(duration_ms)
+        self.count += 1
+        if failed:
+            self.failures += 1
+
+    def snapshot(self) -> dict:
+        """ Counters and p50/p95/p99/max over the rolling window, in milliseconds """
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            'count': self.count,
+            'failures': self.failures,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': ordered[-1] if ordered else 0.0
+        }
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    pymongo command listener keeping latency histograms per collection and command.
+
+    Commands slower than `slow_ms` are appended to `slow_log_path` as tab separated lines.
+    """
+    def __init__(self, slow_ms: float = None, slow_log_path: str = None):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self._lock = threading.Lock()
+        self._running = {}
+        self._histograms = {}
+        self._total = LatencyHistogram()
+
+    @staticmethod
+    def _collection_name(event: monitoring.CommandStartedEvent) -> str:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        return target if isinstance(target, str) else DATABASE_LEVEL
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        key = (event.connection_id, event.request_id)
+        with self._lock:
+            self._running[key] = (self._collection_name(event), event.command_name)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, failed=True)
+
+    def _record(self, event, failed: bool) -> None:
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            collection, command = self._running.pop(
+                (event.connection_id, event.request_id),
+                (DATABASE_LEVEL, event.command_name)
+            )
+            histogram = self._histograms.setdefault((collection, command), LatencyHistogram())
+            histogram.add(duration_ms, failed)
+            self._total.add(duration_ms, failed)
+
+        if self.slow_ms is not None and duration_ms >= self.slow_ms:
+            self._log_slow(collection, command, duration_ms, failed)
+
+    def _log_slow(self, collection: str, command: str, duration_ms: float, failed: bool) -> None:
+        if not self.slow_log_path:
+            return
+        status = "FAILED" if failed else "OK"
+        line = f"{datetime.now().isoformat()}\t{collection}.{command}\t{duration_ms:.1f}ms\t{status}\n"
+        try:
+            with self._lock, open(self.slow_log_path, mode='a', encoding='utf-8') as log_file:
+                log_file.write(line)
+        except OSError as err:
+            print(f"[ERROR] Failed to write slow command log: {err}")
+
+    def snapshot(self) -> dict:
+        """ Latency statistics: overall under 'total', per command under 'commands' keyed `collection.command` """
+        with self._lock:
+            return {
+                'total': self._total.snapshot(),
+                'commands': {
+                    f"{collection}.{command}": histogram.snapshot()
+                    for (collection, command), histogram in sorted(self._histograms.items())
+                }
+            }
+
+    def reset(self) -> None:
+        """ Drop all recorded statistics """
+        with self._lock:
+            self._histograms.clear()
+            self._total = LatencyHistogram()
@@ -0,0 +1,88 @@
+"""
+Import time profiler and export module warm-up.
+
+Set INVOICE_APP_IMPORTTIME=1 to print the slowest imports once the main window is shown,
+similar to `python -X importtime`. Set INVOICE_APP_IMPORT_BUDGET_MS to also warn when
+the total import time of startup goes over that budget.
+"""
+import os
+import sys
+import time
+import builtins
+import importlib
+import threading
+
+ENABLED = os.environ.get('INVOICE_APP_IMPORTTIME', '') not in ('', '0')
+IMPORT_BUDGET_MS = float(os.environ.get('INVOICE_APP_IMPORT_BUDGET_MS', '0'))
+
+# Modules only needed when exporting an invoice
+EXPORT_MODULES = (
+    'openpyxl',
+    'PIL.Image',
+    'spire.xls',
+    'tools.invoice_builder',
+)
+
+_original_import = builtins.__import__
+_local = threading.local()
+_timings = {}   # module name -> [self ms, cumulative ms]
+_lock = threading.Lock()
+
+
+def _timed_import(name, globals_=None, locals_=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals_, locals_, fromlist, level)
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals_, locals_, fromlist, level)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _lock:
+            _timings[name] = [elapsed - children, elapsed]
+
+
+def install() -> None:
+    """ Start recording import times """
+    builtins.__import__ = _timed_import
+
+
+def report(limit: int = 20) -> str:
+    """ Slowest imports by self time, with cumulative time and total """
+    with _lock:
+        rows = sorted(_timings.items(), key=lambda item: item[1][0], reverse=True)
+        total = sum(self_ms for self_ms, _ in _timings.values())
+
+    lines = [f"{'self [ms]':>10} | {'cumulative [ms]':>15} | module"]
+    lines.extend(f"{self_ms:>10.1f} | {cumulative_ms:>15.1f} | {name}"
+                 for name, (self_ms, cumulative_ms) in rows[:limit])
+    lines.append(f"Total import time: {total:.1f} ms over {len(rows)} modules")
+    if IMPORT_BUDGET_MS and total > IMPORT_BUDGET_MS:
+        lines.append(f"[WARNING] Import time budget exceeded: {total:.1f} ms > {IMPORT_BUDGET_MS:.1f} ms")
+    return '\n'.join(lines)
+
+
+def print_report() -> None:
+    """ Print import time report to stderr """
+    print(report(), file=sys.stderr)
+
+
+def warm_up(modules: tuple = EXPORT_MODULES) -> threading.Thread:
+    """ Import modules in a background thread so first use does not pay for it """
+    def run():
+        for module in modules:
+            try:
+                importlib.import_module(module)
+            except ImportError as err:
+                print(f"[ERROR] Failed to warm up module '{module}': {err}")
+
+    thread = threading.Thread(target=run, name="WarmUpThread", daemon=True)
+    thread.start()
+    return thread
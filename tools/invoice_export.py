@@ -0,0 +1,181 @@
+""" Background invoice export """
+
+
+import os
+import threading
+from types import MappingProxyType
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from common.constants import ExportStage, InvoiceRenderer
+from tools.utils import expand_env_vars_in_path
+
+# Files an export can leave in the export folder
+OUTPUT_EXTENSIONS = ('.xlsx', '.pdf')
+
+
+class InvoiceSnapshot():
+    """
+    Read-only copy of one sale taken when export starts.
+
+    Rows, customer and totals are copied into read-only mappings so the cart and the
+    customer form can be cleared and reused while the export still runs.
+    """
+    __slots__ = ('invoice_id', 'invoice_data', 'customer_data', 'totals')
+
+    def __init__(self, invoice_id: str, invoice_data: list, customer_data: dict, totals: dict):
+        object.__setattr__(self, 'invoice_id', invoice_id)
+        object.__setattr__(self, 'invoice_data', tuple(MappingProxyType(dict(row)) for row in invoice_data))
+        object.__setattr__(self, 'customer_data', MappingProxyType(dict(customer_data)))
+        object.__setattr__(self, 'totals', MappingProxyType(dict(totals)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+
+def run_export_stage(builder, stage: ExportStage, snapshot: InvoiceSnapshot, path: str = None,
+                     output_name: str = None) -> str:
+    """
+    Run one export stage of a builder, return the path of the file written so far.
+    Files are named output_name, the invoice id by default.
+    """
+    output_name = output_name or snapshot.invoice_id
+    if stage == ExportStage.LAYOUT:
+        builder.layout(snapshot.invoice_data, snapshot.customer_data, totals=snapshot.totals)
+        return None
+    if stage == ExportStage.SAVE:
+        return builder.save_xlsx(output_name)
+    if stage == ExportStage.RENDER:
+        return builder.render_pdf(output_name)
+    return builder.export_pdf(path)
+
+
+class ExportJob(QRunnable):
+    """ Export of one snapshot, runs the stages in order and stops before the next one once cancelled """
+    def __init__(self, exporter: 'InvoiceExporter', snapshot: InvoiceSnapshot, job_id: str):
+        super().__init__()
+        # Kept in InvoiceExporter until finished, the pool must not delete it
+        self.setAutoDelete(False)
+        self.exporter = exporter
+        self.snapshot = snapshot
+        self.job_id = job_id
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """ Stop before the next stage, a running stage is finished first """
+        self._cancelled.set()
+
+    def run(self) -> None:
+        path = None
+        try:
+            builder = self.exporter.builder
+            for stage in builder.EXPORT_STAGES:
+                if self._cancelled.is_set():
+                    self._remove(path)
+                    self.exporter.cancelled.emit(self.job_id)
+                    return
+                self.exporter.progress.emit(self.job_id, stage)
+                path = run_export_stage(builder, stage, self.snapshot, path, output_name=self.job_id)
+        except Exception as err: # pylint: disable=broad-exception-caught
+            print(f"[ERROR] Failed to export invoice {self.job_id}: {err}")
+            self.exporter.failed.emit(self.job_id, str(err))
+            return
+        self.exporter.finished.emit(self.job_id, path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """ Remove the partial output of a cancelled export """
+        if path and os.path.isfile(path):
+            os.remove(path)
+
+
+class InvoiceExporter(QObject):
+    """
+    Runs invoice exports on a single thread QThreadPool.
+
+    Jobs run one at a time in submit order, so the invoice builders and their workbooks are
+    only ever used by the pool thread. The builder is picked by `invoice_renderer` in config.
+    Progress and results are signals emitted from that thread, connected slots on the GUI
+    thread receive them queued. Signals carry the job id, which is also the name of the
+    output file: the invoice id, with a suffix when that name is already taken.
+    """
+    progress = pyqtSignal(str, object)
+    finished = pyqtSignal(str, str)
+    failed = pyqtSignal(str, str)
+    cancelled = pyqtSignal(str)
+
+    def __init__(self, context, parent=None):
+        super().__init__(parent)
+        self.context = context
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._jobs: dict[str, ExportJob] = {}   # job id -> queued or running job, in submit order
+        self._job_ids: set[str] = set()         # every job id handed out, never reused
+        self._builders = {}
+
+        for signal in (self.finished, self.failed, self.cancelled):
+            signal.connect(self._on_job_done)
+
+    @property
+    def builder(self):
+        """ Builder of the configured renderer, created by the first job to keep openpyxl out of startup """
+        renderer = InvoiceRenderer(self.context.config.invoice_renderer)
+        if renderer not in self._builders:
+            # pylint: disable=import-outside-toplevel
+            if renderer == InvoiceRenderer.PDF:
+                from tools.pdf_renderer import PdfInvoiceRenderer
+                self._builders[renderer] = PdfInvoiceRenderer(self.context)
+            else:
+                from tools.invoice_builder import InvoiceBuilder
+                self._builders[renderer] = InvoiceBuilder(self.context)
+        return self._builders[renderer]
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def submit(self, snapshot: InvoiceSnapshot) -> str:
+        """ Queue export of a sale, return the job id """
+        job_id = self._new_job_id(snapshot.invoice_id)
+        job = ExportJob(self, snapshot, job_id)
+        self._jobs[job_id] = job
+        self.pool.start(job)
+        return job_id
+
+    def _new_job_id(self, invoice_id: str) -> str:
+        """ Invoice id, suffixed while the id was handed out or its output file already exists """
+        export_folder = expand_env_vars_in_path(self.context.config.export_folder)
+        job_id, suffix = invoice_id, 1
+        while job_id in self._job_ids or any(
+            os.path.exists(os.path.join(export_folder, f"{job_id}{extension}")) for extension in OUTPUT_EXTENSIONS
+        ):
+            suffix += 1
+            job_id = f"{invoice_id}_{suffix}"
+        self._job_ids.add(job_id)
+        return job_id
+
+    def current(self) -> str:
+        """ Job id of the oldest unfinished export, None when idle """
+        return next(iter(self._jobs), None)
+
+    def cancel(self, job_id: str) -> None:
+        """ Cancel an export, a queued one is dropped right away """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if self.pool.tryTake(job):
+            self.cancelled.emit(job_id)
+        else:
+            job.cancel()
+
+    def cancel_queued(self) -> None:
+        """ Drop every export that has not started, the running one is left to finish """
+        for job_id, job in list(self._jobs.items()):
+            if self.pool.tryTake(job):
+                self.cancelled.emit(job_id)
+
+    def wait_for_done(self, timeout_ms: int = -1) -> bool:
+        """ Block until queued exports are finished, False on timeout """
+        return self.pool.waitForDone(timeout_ms)
+
+    def _on_job_done(self, job_id: str, *_) -> None:
+        self._jobs.pop(job_id, None)
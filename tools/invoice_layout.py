@@ -0,0 +1,220 @@
+"""
+Renderer independent layout of the invoice.
+
+InvoiceLayout places the shop header, customer block, item table and signature on the
+sheet grid of columns A to G. InvoiceBuilder writes it to an xlsx sheet and
+PdfInvoiceRenderer paints it to pdf, so both outputs share one set of column widths,
+row heights, blocks and labels.
+
+Column widths are Excel character widths and row heights Excel row heights in points.
+"""
+import os
+from datetime import datetime
+
+from common.constants import TableAttribute
+from tools.utils import expand_env_vars_in_path, format_money
+
+COLUMN_WIDTHS = {
+    "A": 5,   # STT
+    "B": 34,  # Tên mặt hàng
+    "C": 16,  # Đơn vị tính
+    "D": 14,  # Số lượng
+    "E": 18,  # Đơn giá
+    "F": 10,  # Thành tiền 1
+    "G": 15   # Thành tiền 2
+}
+ROW_HEIGHTS = {
+    3: 45,
+    4: 30
+}
+SIGNATURE_ROW_HEIGHT = 50
+
+DEFAULT_FONT_SIZE = 11
+NORMAL_SIZE = 12
+MIDDLE_SIZE = 16
+BIG_SIZE = 25
+TOTAL_SIZE = 15
+
+TABLE_HEADERS = ("STT", "Tên mặt hàng", "Đơn vị tính", "Số lượng", "Đơn giá", "Thành tiền")
+TOTAL_LABEL = "Tổng Tiền:"
+DATE_FORMAT = "Ngày %d, Tháng %m, Năm %Y"
+BUYER_LABEL = "Đơn vị mua hàng"
+PAID_LABEL = "ĐÃ NHẬN ĐỦ TIỀN"
+SELLER_LABEL = "Đơn vị bán hàng"
+SIGN_HINT = "(Kí và ghi rõ họ tên)"
+
+# Border styles, openpyxl side style names
+THIN = "thin"
+THICK = "thick"
+DASHED = "dashed"
+
+
+class InvoiceCell():
+    """
+    Value of a merged cell range.
+
+    Numbers keep their int value, `formula` is the xlsx formula computing it from other
+    cells. `align` is (horizontal, vertical) with openpyxl alignment names.
+    """
+    __slots__ = ('first_col', 'row', 'last_col', 'last_row', 'value', 'formula', 'number',
+                 'bold', 'size', 'align', 'wrap')
+
+    def __init__(self, cell_range: str, value="", bold: bool = False, size: int = DEFAULT_FONT_SIZE,
+                 align: tuple = ("center", "center"), wrap: bool = False, number: bool = False, formula: str = None):
+        first, last = cell_range.split(":")
+        self.first_col, self.row = first[0], int(first[1:])
+        self.last_col, self.last_row = last[0], int(last[1:])
+        self.value = value
+        self.formula = formula
+        self.number = number
+        self.bold = bold
+        self.size = size
+        self.align = align
+        self.wrap = wrap
+
+    @property
+    def first(self) -> str:
+        """ Top left cell, e.g. 'A2' """
+        return f"{self.first_col}{self.row}"
+
+    @property
+    def last(self) -> str:
+        """ Bottom right cell """
+        return f"{self.last_col}{self.last_row}"
+
+    @property
+    def text(self) -> str:
+        """ Display text, numbers in the app's money format """
+        if self.value is None:
+            return ""
+        if self.number:
+            return format_money(self.value)
+        return str(self.value)
+
+
+class InvoiceLine():
+    """ Border along the top or bottom of a row over a column range """
+    __slots__ = ('row', 'first_col', 'last_col', 'style', 'bottom')
+
+    def __init__(self, row: int, first_col: str, last_col: str, style: str = THIN, bottom: bool = True):
+        self.row = row
+        self.first_col = first_col
+        self.last_col = last_col
+        self.style = style
+        self.bottom = bottom
+
+
+class InvoiceLayout():
+    """ Cells, borders, row heights and signature image of one invoice """
+    def __init__(self, shop_info, invoice_data: list, customer_data: dict, totals: dict = None):
+        self.shop_info = shop_info
+        self.cells: list[InvoiceCell] = []
+        self.lines: list[InvoiceLine] = []
+        self.row_heights: dict[int, float] = dict(ROW_HEIGHTS)
+        self.image: InvoiceCell = None    # cell range of the signature, value is the image path
+
+        row = self._build_shop_info()
+        row = self._build_customer_info(start_row=row, customer_data=customer_data)
+        row = self._build_invoice(start_row=row, invoice_data=invoice_data, totals=totals)
+        self._build_confirm(start_row=row)
+
+    def _merge(self, cell_range: str, value="", **style) -> InvoiceCell:
+        cell = InvoiceCell(cell_range, value, **style)
+        self.cells.append(cell)
+        return cell
+
+    def _draw_line(self, row: int, start_col: str, end_col: str, style: str = THIN, bottom: bool = True):
+        self.lines.append(InvoiceLine(row, start_col, end_col, style, bottom))
+
+    def _build_shop_info(self) -> int:
+        title = {"bold": True, "size": NORMAL_SIZE, "wrap": True}
+        self._merge("A2:D2", self.shop_info.shop_title, **title)
+        self._merge("A3:D3", self.shop_info.shop_name, bold=True, size=BIG_SIZE, wrap=True)
+        self._merge("A4:D4", self.shop_info.shop_address, size=NORMAL_SIZE, wrap=True)
+        self._merge("A5:D5", self.shop_info.shop_phone, **title)
+        self._merge("A6:D6", self.shop_info.shop_bank, **title)
+        self._merge("A7:D7", self.shop_info.shop_owner, **title)
+        self._merge("E3:G4", self.shop_info.shop_specialty, bold=True, size=MIDDLE_SIZE, wrap=True)
+        self._merge("E6:F6", self.shop_info.invoice_title, **title)
+        self._merge("G6:G6", self.shop_info.invoice_number, **title)
+
+        row = 8
+        self._draw_line(row, 'A', 'G')
+        return row
+
+    def _build_customer_info(self, start_row: int, customer_data: dict) -> int:
+        start_row = start_row + 1
+        for index, (key, item) in enumerate(customer_data.items()):
+            row = start_row + index
+            self._merge(f"A{row}:B{row}", key, bold=True, size=NORMAL_SIZE, wrap=True)
+            self._merge(f"C{row}:G{row}", item, bold=True, size=NORMAL_SIZE, wrap=True)
+            self._draw_line(row, 'C', 'G', DASHED)
+
+        row += 1
+        self._draw_line(row, 'A', 'G')
+        return row
+
+    def _build_invoice(self, start_row: int, invoice_data: list, totals: dict = None) -> int:
+        """
+        Item table. The xlsx total stays a SUM formula over the line amounts so it follows
+        edits of the sheet; its value, shown in pdf, is taken from cart totals when given.
+        """
+        right = ("right", "center")
+
+        current_row = start_row + 2
+        for col, header in zip("ABCDE", TABLE_HEADERS):
+            self._merge(f"{col}{current_row}:{col}{current_row}", header, bold=True)
+        self._merge(f"F{current_row}:G{current_row}", TABLE_HEADERS[-1], bold=True)
+
+        current_row = current_row + 1
+        amount_cells = []
+        grand_total = 0
+        for i, item in enumerate(invoice_data, start=1):
+            quantity = int(item[TableAttribute.QUANTITY.value])
+            price = int(item[TableAttribute.PRICE.value])
+            grand_total += quantity * price
+            self._merge(f"A{current_row}:A{current_row}", i)
+            self._merge(f"B{current_row}:B{current_row}", item[TableAttribute.NAME.value])
+            self._merge(f"C{current_row}:C{current_row}", item[TableAttribute.TYPE.value])
+            self._merge(f"D{current_row}:D{current_row}", quantity, number=True)
+            self._merge(f"E{current_row}:E{current_row}", price, align=right, number=True)
+            amount = self._merge(
+                f"F{current_row}:G{current_row}", quantity * price, align=right, number=True,
+                formula=f"=D{current_row}*E{current_row}"
+            )
+            amount_cells.append(amount.first)
+            current_row += 1
+
+        formula = f"=SUM({','.join(amount_cells)})" if amount_cells else None
+        if totals is not None:
+            grand_total = totals['grand_total']
+        self._merge(f"A{current_row}:E{current_row}", TOTAL_LABEL, bold=True, size=TOTAL_SIZE, align=right)
+        self._merge(
+            f"F{current_row}:G{current_row}", grand_total, bold=True, size=TOTAL_SIZE, align=right,
+            number=True, formula=formula
+        )
+
+        self._draw_line(start_row + 3, 'A', 'G', THICK, bottom=False)
+        self._draw_line(current_row, 'A', 'G', THICK, bottom=False)
+        return current_row
+
+    def _build_confirm(self, start_row: int) -> int:
+        row = start_row + 2
+        self._merge(f"E{row}:G{row}", datetime.now().strftime(DATE_FORMAT))
+
+        row += 1
+        self._merge(f"A{row}:B{row}", BUYER_LABEL, bold=True)
+        self._merge(f"C{row}:D{row}", PAID_LABEL, bold=True)
+        self._merge(f"E{row}:G{row}", SELLER_LABEL, bold=True)
+
+        row += 1
+        self._merge(f"A{row}:B{row}", SIGN_HINT, align=("center", "top"))
+        self.row_heights[row] = SIGNATURE_ROW_HEIGHT
+        self._merge(f"E{row}:G{row}", "")
+        self.image = InvoiceCell(
+            f"E{row}:G{row}", os.path.abspath(expand_env_vars_in_path(self.shop_info.sign_img))
+        )
+
+        row += 1
+        self._merge(f"E{row}:G{row}", self.shop_info.shop_owner, bold=True)
+        return row
@@ -0,0 +1,95 @@
+"""
+Bulk import of line items from pasted text, CSV/TSV files or xlsx workbooks.
+
+Rows are expected in the product form order: name, quantity, unit, price. A first row
+holding the column titles is skipped, blank rows are ignored. Files are read row by row,
+quantities and prices are checked with the LINE_ITEM rules of the product form, prices may
+carry money formatting.
+"""
+import io
+import os
+import csv
+from typing import Iterable, Iterator
+
+from common.constants import TableAttribute
+from common.validation import LINE_ITEM, FieldError
+from tools.utils import clear_format_money
+
+# Column order, same as the product input form
+IMPORT_COLUMNS = tuple(rule.key for rule in LINE_ITEM)
+MONEY_COLUMNS = (TableAttribute.PRICE,)
+TITLE_COLUMNS = (TableAttribute.NAME, TableAttribute.TYPE)
+XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+
+
+def _delimiter_of(first_line: str) -> str:
+    """ Tab separated when the first line has a tab, comma separated otherwise """
+    return '\t' if '\t' in first_line else ','
+
+
+def parse_delimited(text: str) -> list[list[str]]:
+    """ Split pasted or CSV/TSV text into rows """
+    delimiter = _delimiter_of(text.split('\n', 1)[0])
+    return list(csv.reader(io.StringIO(text), delimiter=delimiter))
+
+
+def read_rows(path: str) -> Iterator[list]:
+    """ Yield rows of a CSV/TSV file or the first sheet of an xlsx workbook, the file stays open until exhausted """
+    if os.path.splitext(path)[1].lower() in XLSX_EXTENSIONS:
+        from openpyxl import load_workbook # pylint: disable=import-outside-toplevel
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+        return
+
+    with open(path, mode='r', encoding='utf-8-sig', newline='') as import_file:
+        delimiter = _delimiter_of(import_file.readline())
+        import_file.seek(0)
+        yield from csv.reader(import_file, delimiter=delimiter)
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _is_header(cells: list[str]) -> bool:
+    titles = [attribute.value.lower() for attribute in IMPORT_COLUMNS]
+    return [cell.lower() for cell in cells[:len(titles)]] == titles
+
+
+def _records_of(rows: Iterable[list]) -> Iterator[tuple[int, dict]]:
+    """ Cleaned (line, record) pairs of the data rows, 1-based line numbers """
+    for line, row in enumerate(rows, start=1):
+        cells = [_cell_text(value) for value in row]
+        if not any(cells) or (line == 1 and _is_header(cells)):
+            continue
+        cells += [""] * (len(IMPORT_COLUMNS) - len(cells))
+
+        record = {}
+        for attribute, cell in zip(IMPORT_COLUMNS, cells):
+            if attribute in MONEY_COLUMNS:
+                cell = clear_format_money(cell)
+            elif attribute in TITLE_COLUMNS:
+                cell = cell.title()
+            record[attribute] = cell
+        yield line, record
+
+
+def validate_rows(rows: Iterable[list]) -> tuple[list[dict], list[FieldError]]:
+    """
+    Validate all rows in one pass.
+
+    Quantities must be whole numbers above 0: "0", "1 000", "2.5", "1,5" or a fractional
+    xlsx number are row errors instead of being read as something else.
+
+    Returns the valid rows as product input dicts keyed by TableAttribute, and the errors
+    of the rejected rows with their 1-based line numbers.
+    """
+    return LINE_ITEM.validate_many(_records_of(rows))
@@ -2,15 +2,63 @@
 
 
 import os
+import re
 import threading
+from typing import Iterator, Optional
+from datetime import datetime, timezone
 
-from pymongo import MongoClient
+import pymongo
+from pydotdict import DotDict
+from pymongo import MongoClient, UpdateOne, ASCENDING, uri_parser
+from pymongo.errors import PyMongoError, BulkWriteError
 from PyQt5.QtCore import QObject, pyqtSignal
 
-from common.constants import MongoDBStatus, DBCollection
-from tools.utils import load_json
+from common.constants import MongoDBStatus, DBCollection, WriteStatus, CustomerAttribute, TableAttribute
+from common.search_completer import fold_text
+from tools.utils import load_json, expand_env_vars_in_path
+from tools.write_queue import WriteBehindQueue
+from tools.db_migrations import MigrationManager, SEARCH_NAME_FIELD
+from tools.db_monitor import CommandMonitor
 
 CONFIG_DIR = os.environ['CONFIG_DIR']
+CLIENT_BULK_WRITE_VERSION = (8, 0)
+
+# Collections whose documents carry an `updated_at` write timestamp for incremental reads
+STAMPED_COLLECTIONS = (DBCollection.CUSTOMER, DBCollection.PRODUCT)
+
+# Number of invoices a customer or product appeared on, incremented by each invoice commit
+SALE_COUNT_FIELD = 'sale_count'
+SALE_COUNTED_COLLECTIONS = (DBCollection.CUSTOMER, DBCollection.PRODUCT)
+
+# Fields needed to fill and rank suggestion completers
+CUSTOMER_PROJECTION = {**{attr.value: 1 for attr in CustomerAttribute}, SALE_COUNT_FIELD: 1}
+PRODUCT_PROJECTION = {
+    TableAttribute.NAME.value: 1,
+    TableAttribute.TYPE.value: 1,
+    TableAttribute.PRICE.value: 1,
+    SALE_COUNT_FIELD: 1
+}
+
+
+class InvoiceCommit():
+    """ Customer, products and invoice of one sale, written to database as a single unit """
+    def __init__(self, customer: dict, products: list, invoice: dict):
+        self.customer = customer
+        self.products = products
+        self.invoice = invoice
+
+    @property
+    def key(self) -> str:
+        """ Invoice id identifying this commit """
+        return self.invoice["_id"]
+
+    def documents(self) -> list[tuple[DBCollection, dict]]:
+        """ All documents in write order: customer, products, then invoice """
+        docs = [(DBCollection.CUSTOMER, self.customer)]
+        docs.extend((DBCollection.PRODUCT, product) for product in self.products)
+        docs.append((DBCollection.INVOICE, self.invoice))
+        return docs
+
 
 class MongoDBClient(QObject):
     """ Mongo Database Client """
@@ -19,19 +67,29 @@ class MongoDBClient(QObject):
     def __init__(self):
         super().__init__()
         self.config = load_json(os.path.join(CONFIG_DIR, 'config.json'))
+        self.monitor = CommandMonitor(
+            slow_ms=self.config.slow_command_ms,
+            slow_log_path=expand_env_vars_in_path(self.config.slow_command_log)
+        )
         self.client = MongoClient(
             self.config.mongodb_endpoint,
             timeoutMS=self.config.mongodb_timeout,
             socketTimeoutMS=self.config.mongodb_timeout,
-            connectTimeoutMS=self.config.mongodb_timeout
+            connectTimeoutMS=self.config.mongodb_timeout,
+            event_listeners=[self.monitor]
         )
-        database = self.client["invoice_app"]
+        self.database = self.client["invoice_app"]
         self.collections = {
-            DBCollection.INVOICE: database[DBCollection.INVOICE.name.lower()],
-            DBCollection.CUSTOMER: database[DBCollection.CUSTOMER.name.lower()],
-            DBCollection.PRODUCT: database[DBCollection.PRODUCT.name.lower()]
+            DBCollection.INVOICE: self.database[DBCollection.INVOICE.name.lower()],
+            DBCollection.CUSTOMER: self.database[DBCollection.CUSTOMER.name.lower()],
+            DBCollection.PRODUCT: self.database[DBCollection.PRODUCT.name.lower()],
+            DBCollection.METADATA: self.database[DBCollection.METADATA.name.lower()]
         }
         self.is_connected = True
+        self.server_version = ()
+        self.supports_transactions = False
+        self.schema_report = None
+        self.write_queue = WriteBehindQueue(self)
 
     def start(self):
         """ Start MongoDB Client """
@@ -42,17 +100,49 @@ class MongoDBClient(QObject):
         )
         mongodb_thread.start()
 
+    @property
+    def address(self) -> tuple[str, int]:
+        """ Host and port of the first server in the configured endpoint """
+        return uri_parser.parse_uri(self.config.mongodb_endpoint)['nodelist'][0]
+
+    def ping(self, timeout: float) -> bool:
+        """ Send ping command, return True if server answered within timeout seconds """
+        try:
+            with pymongo.timeout(timeout):
+                self.client.admin.command("ping")
+            return True
+        except PyMongoError:
+            return False
+
     def check_connection(self):
         """ Check connect to MongoDB """
         try:
-            self.client.server_info()
+            server_info = self.client.server_info()
+            self.server_version = tuple(server_info.get("versionArray", ()))
+            hello = self.client.admin.command("hello")
+            self.supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
             self.is_connected = True
+            if self.schema_report is None:
+                self.migrate()
             self.finish_signal.emit(MongoDBStatus.CONNECTED.value)
         except Exception:  # pylint: disable=broad-exception-caught
             self.is_connected = False
 
         return self.is_connected
 
+    def migrate(self) -> Optional[DotDict]:
+        """ Bring indexes and schema version of the database up to date, None when migration failed """
+        try:
+            self.schema_report = MigrationManager(self.collections).run()
+        except PyMongoError as err:
+            # Database stays usable without indexes, migration is retried on next connect
+            print(f"[ERROR] Failed to migrate database: {err}")
+            return None
+
+        if self.schema_report.built:
+            print(f"[INFO] Built indexes: {', '.join(self.schema_report.built)}")
+        return self.schema_report
+
     def disconnect_client(self):
         """ Disconnect to MongoDB"""
         if self.is_connected:
@@ -62,35 +152,289 @@ class MongoDBClient(QObject):
             self,
             data: dict,
             collection_type: DBCollection
-        ) -> bool|str:
-        """ Insert one document to specific collection """
-        collection = self.collections[collection_type]
+        ) -> bool:
+        """ Insert or replace one document in specific collection """
+        return self.upsert_document(data, collection_type) != WriteStatus.FAILED
+
+    def upsert_document(
+            self,
+            data: dict,
+            collection_type: DBCollection
+        ) -> WriteStatus:
+        """ Upsert one document by its _id and report whether it was inserted or updated """
         data_id = data.get("_id", None)
-        if not data_id:
-            return False
+        if not data_id or not self.is_connected:
+            return WriteStatus.FAILED
+
+        try:
+            result = self.collections[collection_type].update_one(
+                {'_id': data_id},
+                self._update_of(collection_type, data),
+                upsert=True
+            )
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to upsert document '{data_id}': {err}")
+            return WriteStatus.FAILED
+
+        return WriteStatus.INSERTED if result.upserted_id is not None else WriteStatus.UPDATED
 
+    def bulk_upsert(
+            self,
+            docs: list,
+            collection_type: DBCollection
+        ) -> list[WriteStatus]:
+        """
+        Upsert many documents with a single bulk_write call.
+
+        Returns one WriteStatus per input document, in the same order.
+        Documents without an _id are reported as FAILED and never sent.
+        """
+        statuses = [WriteStatus.FAILED] * len(docs)
         if not self.is_connected:
-            return False
+            return statuses
 
-        if data_id in collection.distinct("_id"):
-            collection.replace_one({'_id': data_id}, data)
-        else:
-            collection.insert_one(data)
-        return True
+        requests, positions = [], []
+        stamp = datetime.now(timezone.utc)
+        for index, doc in enumerate(docs):
+            data_id = doc.get("_id", None)
+            if data_id:
+                requests.append(UpdateOne({'_id': data_id}, self._update_of(collection_type, doc, stamp), upsert=True))
+                positions.append(index)
+        if not requests:
+            return statuses
 
-    def get_customer_info(self) -> list:
-        """ Get all customer information """
+        try:
+            result = self.collections[collection_type].bulk_write(requests, ordered=False)
+            upserted = result.upserted_ids
+            failed = set()
+        except BulkWriteError as err:
+            upserted = {item['index']: item['_id'] for item in err.details.get('upserted', [])}
+            failed = {item['index'] for item in err.details.get('writeErrors', [])}
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to bulk upsert {len(requests)} documents: {err}")
+            return statuses
+
+        for request_index, doc_index in enumerate(positions):
+            if request_index in failed:
+                continue
+            if request_index in upserted:
+                statuses[doc_index] = WriteStatus.INSERTED
+            else:
+                statuses[doc_index] = WriteStatus.UPDATED
+        return statuses
+
+    def commit_invoice(self, commit: InvoiceCommit) -> DotDict:
+        """
+        Write customer, products and invoice of one sale together.
+
+        On MongoDB 8.0+ all documents go out in one ordered client-level bulk_write,
+        older servers get one ordered bulk_write per collection. When the server is
+        a replica set or sharded cluster the writes run inside a multi-document
+        transaction, so either the whole invoice is stored or nothing is.
+        """
+        result = DotDict({
+            'status': False,
+            'inserted': 0,
+            'updated': 0,
+            'transaction': False
+        })
         if not self.is_connected:
-            return []
+            return result
 
-        return list(self.collections[DBCollection.CUSTOMER].find())            
+        try:
+            with self.client.start_session() as session:
+                if self.supports_transactions:
+                    inserted, updated = session.with_transaction(
+                        lambda s: self._write_commit(commit, s)
+                    )
+                    result.transaction = True
+                else:
+                    inserted, updated = self._write_commit(commit, session)
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to commit invoice '{commit.key}': {err}")
+            return result
 
-    def get_product_info(self) -> list:
-        """ Get all product information """
+        result.update({
+            'status': True,
+            'inserted': inserted,
+            'updated': updated
+        })
+        return result
+
+    def _write_commit(self, commit: InvoiceCommit, session) -> tuple[int, int]:
+        """
+        Send all documents of a commit with ordered upserts, return (inserted, updated).
+
+        Sale counts of the customer and products are incremented on the server.
+        """
+        stamp = datetime.now(timezone.utc)
+        if self.server_version >= CLIENT_BULK_WRITE_VERSION:
+            requests = [
+                UpdateOne(
+                    {'_id': doc["_id"]},
+                    self._update_of(collection_type, doc, stamp, count_sale=True),
+                    upsert=True,
+                    namespace=self.collections[collection_type].full_name
+                )
+                for collection_type, doc in commit.documents()
+            ]
+            bulk_result = self.client.bulk_write(requests, ordered=True, session=session)
+            return bulk_result.upserted_count, bulk_result.matched_count
+
+        grouped = {}
+        for collection_type, doc in commit.documents():
+            grouped.setdefault(collection_type, []).append(
+                UpdateOne(
+                    {'_id': doc["_id"]},
+                    self._update_of(collection_type, doc, stamp, count_sale=True),
+                    upsert=True
+                )
+            )
+
+        inserted, updated = 0, 0
+        for collection_type, requests in grouped.items():
+            bulk_result = self.collections[collection_type].bulk_write(requests, ordered=True, session=session)
+            inserted += bulk_result.upserted_count
+            updated += bulk_result.matched_count
+        return inserted, updated
+
+    @staticmethod
+    def _stamp(collection_type: DBCollection, doc: dict, stamp: datetime = None) -> dict:
+        """ Return a copy of doc with its write timestamp set, for collections read incrementally """
+        if collection_type not in STAMPED_COLLECTIONS:
+            return doc
+        return {**doc, 'updated_at': stamp or datetime.now(timezone.utc)}
+
+    @classmethod
+    def _update_of(
+            cls,
+            collection_type: DBCollection,
+            doc: dict,
+            stamp: datetime = None,
+            count_sale: bool = False
+        ) -> dict:
+        """
+        Update setting every field of doc, used instead of a replacement so that
+        server side counters such as the sale count survive rewrites of the document.
+        Customers also get their folded search name.
+        """
+        fields = {
+            key: value for key, value in cls._stamp(collection_type, doc, stamp).items()
+            if key not in ('_id', SALE_COUNT_FIELD)
+        }
+        if collection_type == DBCollection.CUSTOMER and CustomerAttribute.NAME.value in doc:
+            fields[SEARCH_NAME_FIELD] = fold_text(doc[CustomerAttribute.NAME.value] or "")
+        update = {'$set': fields}
+        if count_sale and collection_type in SALE_COUNTED_COLLECTIONS:
+            update['$inc'] = {SALE_COUNT_FIELD: 1}
+        return update
+
+    def iter_documents(
+            self,
+            collection_type: DBCollection,
+            projection: dict = None,
+            batch_size: int = None,
+            since: datetime = None
+        ) -> Iterator[dict]:
+        """
+        Stream documents of a collection, fetching them from server in batches.
+
+        With `since`, only documents written at or after that time are returned.
+        """
         if not self.is_connected:
+            return
+
+        query = {'updated_at': {'$gte': since}} if since is not None else {}
+        cursor = self.collections[collection_type].find(
+            query,
+            projection,
+            batch_size=batch_size or self.config.mongodb_batch_size
+        )
+        try:
+            yield from cursor
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to read {collection_type.name.lower()} collection: {err}")
+        finally:
+            cursor.close()
+
+    def get_page(
+            self,
+            collection_type: DBCollection,
+            after_id: str = None,
+            limit: int = None,
+            projection: dict = None
+        ) -> list:
+        """ Get one page of documents ordered by _id, starting after `after_id` """
+        if not self.is_connected:
+            return []
+
+        query = {'_id': {'$gt': after_id}} if after_id is not None else {}
+        limit = limit or self.config.suggestion_page_size
+        try:
+            cursor = self.collections[collection_type].find(query, projection).sort('_id', ASCENDING).limit(limit)
+            return list(cursor)
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to read {collection_type.name.lower()} collection: {err}")
             return []
 
-        return list(self.collections[DBCollection.PRODUCT].find())
+    def iter_customer_info(
+            self,
+            projection: dict = None,
+            batch_size: int = None,
+            since: datetime = None
+        ) -> Iterator[dict]:
+        """ Stream customer information """
+        return self.iter_documents(DBCollection.CUSTOMER, projection or CUSTOMER_PROJECTION, batch_size, since)
+
+    def iter_product_info(
+            self,
+            projection: dict = None,
+            batch_size: int = None,
+            since: datetime = None
+        ) -> Iterator[dict]:
+        """ Stream product information """
+        return self.iter_documents(DBCollection.PRODUCT, projection or PRODUCT_PROJECTION, batch_size, since)
+
+    def get_customer_page(self, after_id: str = None, limit: int = None) -> list:
+        """ Get one page of customer information """
+        return self.get_page(DBCollection.CUSTOMER, after_id, limit, CUSTOMER_PROJECTION)
+
+    def get_product_page(self, after_id: str = None, limit: int = None) -> list:
+        """ Get one page of product information """
+        return self.get_page(DBCollection.PRODUCT, after_id, limit, PRODUCT_PROJECTION)
+
+    def search_customers(self, text: str, limit: int = None) -> Optional[list]:
+        """
+        Customers whose phone number or name starts with text, for remote completion.
+
+        Digits are matched against the phone number _id, anything else against the folded
+        name, both as anchored prefixes so the server answers from an index. Returns None
+        when the query could not run, so a failure is never mistaken for an empty result.
+        """
+        text = text.strip()
+        if not text:
+            return []
+        if not self.is_connected:
+            return None
+
+        if text.isdigit():
+            query = {'_id': {'$regex': f"^{re.escape(text)}"}}
+        else:
+            query = {SEARCH_NAME_FIELD: {'$regex': f"^{re.escape(fold_text(text))}"}}
+        try:
+            cursor = self.collections[DBCollection.CUSTOMER].find(query, CUSTOMER_PROJECTION)
+            return list(cursor.limit(limit or self.config.remote_completion_limit))
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to search customers '{text}': {err}")
+            return None
+
+    def get_customer_info(self) -> list:
+        """ Get all customer information """
+        return list(self.iter_customer_info())
+
+    def get_product_info(self) -> list:
+        """ Get all product information """
+        return list(self.iter_product_info())
 
 if __name__=="__main__":
     db = MongoDBClient()
@@ -0,0 +1,193 @@
+"""
+Native pdf rendering of invoices with QPdfWriter and QPainter.
+
+Paints the InvoiceLayout shared with the xlsx invoice of InvoiceBuilder straight to pdf, so
+no workbook is written, reloaded and converted by Spire. Selected with
+`"invoice_renderer": "pdf"` in config.json.
+
+Units are points. The layout grid is shrunk to the page width as the sheet's fit to width does.
+"""
+import os
+
+from PyQt5.QtCore import Qt, QRectF, QLineF, QMarginsF
+from PyQt5.QtGui import QPdfWriter, QPainter, QPen, QFont, QFontMetricsF, QImage, QPageLayout, QPageSize
+
+from common.constants import CustomerAttribute, ExportStage
+from tools.invoice_layout import InvoiceLayout, InvoiceCell, InvoiceLine, COLUMN_WIDTHS, THIN, THICK, DASHED
+from tools.utils import load_json, expand_env_vars_in_path
+
+DEFAULT_ROW_HEIGHT = 15
+# Points per Excel character width, 7 px at 96 dpi
+CHAR_WIDTH = 5.25
+CELL_PADDING = 2
+FONT_FAMILY = "Calibri"
+# Text overflowing a row of fixed height is shrunk down to this size
+MIN_FONT_SIZE = 6
+# Page margins of the xlsx sheet, 0.3 and 0.4 inch
+PAGE_MARGINS = QMarginsF(21.6, 28.8, 21.6, 28.8)
+
+# Pen width and style of the layout border styles
+PENS = {
+    THIN: (0.5, Qt.SolidLine),
+    THICK: (2.0, Qt.SolidLine),
+    DASHED: (0.5, Qt.DashLine),
+}
+HORIZONTAL_ALIGN = {"left": Qt.AlignLeft, "center": Qt.AlignHCenter, "right": Qt.AlignRight}
+VERTICAL_ALIGN = {"top": Qt.AlignTop, "center": Qt.AlignVCenter, "bottom": Qt.AlignBottom}
+
+
+class PdfInvoiceRenderer():
+    """ Invoice renderer writing pdf directly, same interface as InvoiceBuilder """
+    # Export stages run by ExportJob for this renderer
+    EXPORT_STAGES = (ExportStage.LAYOUT, ExportStage.RENDER)
+
+    def __init__(self, context):
+        self.customer_name = None
+        self.config = context.config
+        self.shop_info = load_json(context.config.shop_info_path)
+        self.invoice_layout: InvoiceLayout = None
+
+    def layout(self, invoice_data: list, customer_data: dict, totals: dict = None):
+        """ Lay out the invoice cells, totals is CartTotals.to_dict() of the cart """
+        self.customer_name = customer_data[CustomerAttribute.NAME.value]
+        self.invoice_layout = InvoiceLayout(self.shop_info, invoice_data, customer_data, totals=totals)
+
+# -------------------------------
+# Painting
+# -------------------------------
+
+    @staticmethod
+    def _font(bold: bool, size: float) -> QFont:
+        font = QFont(FONT_FAMILY)
+        font.setPointSizeF(size)
+        font.setBold(bold)
+        return font
+
+    @staticmethod
+    def _alignment(cell: InvoiceCell) -> Qt.Alignment:
+        horizontal, vertical = cell.align
+        return HORIZONTAL_ALIGN[horizontal] | VERTICAL_ALIGN[vertical]
+
+    def _fitted_font(self, cell: InvoiceCell, rect: QRectF, device) -> QFont:
+        """ Font of cell, shrunk when the text overflows a cell of fixed height """
+        size = cell.size
+        while size > MIN_FONT_SIZE:
+            font = self._font(cell.bold, size)
+            bounds = QFontMetricsF(font, device).boundingRect(QRectF(0, 0, rect.width(), 0), Qt.TextWordWrap, cell.text)
+            if bounds.height() <= rect.height():
+                return font
+            size -= 1
+        return self._font(cell.bold, MIN_FONT_SIZE)
+
+    def _fit_row_heights(self, column_x: dict, device) -> dict[int, float]:
+        """ Rows without a set height grow to fit their wrapped single row cells """
+        heights = {}
+        cells, row_heights = self.invoice_layout.cells, self.invoice_layout.row_heights
+        for cell in cells:
+            if cell.row != cell.last_row or cell.row in row_heights or not cell.text:
+                continue
+            width = column_x[cell.last_col][1] - column_x[cell.first_col][0] - 2 * CELL_PADDING
+            metrics = QFontMetricsF(self._font(cell.bold, cell.size), device)
+            needed = metrics.boundingRect(QRectF(0, 0, width, 0), Qt.TextWordWrap, cell.text).height()
+            heights[cell.row] = max(heights.get(cell.row, DEFAULT_ROW_HEIGHT), needed + 2 * CELL_PADDING)
+        last_row = max(cell.last_row for cell in cells)
+        return {
+            row: row_heights.get(row, heights.get(row, DEFAULT_ROW_HEIGHT))
+            for row in range(1, last_row + 1)
+        }
+
+    @staticmethod
+    def _paginate(heights: dict[int, float], page_height: float) -> dict[int, tuple[int, float]]:
+        """ Page and top of each row, rows that do not fit start a new page """
+        positions, page, top = {}, 0, 0.0
+        for row, height in heights.items():
+            if top + height > page_height and top > 0:
+                page, top = page + 1, 0.0
+            positions[row] = (page, top)
+            top += height
+        return positions
+
+    def render_pdf(self, invoice_id: str) -> str:
+        """ Paint the laid out invoice to a pdf in the export folder, return the pdf path """
+        export_folder = expand_env_vars_in_path(self.config.export_folder)
+        os.makedirs(export_folder, exist_ok=True)
+        pdf_path = os.path.join(export_folder, f"{invoice_id}.pdf")
+
+        writer = QPdfWriter(pdf_path)
+        # One device unit is one point
+        writer.setResolution(72)
+        writer.setPageLayout(QPageLayout(QPageSize(QPageSize.A4), QPageLayout.Portrait, PAGE_MARGINS))
+        writer.setTitle(invoice_id)
+
+        column_x, left = {}, 0.0
+        for col, width in COLUMN_WIDTHS.items():
+            column_x[col] = (left, left + width * CHAR_WIDTH)
+            left += width * CHAR_WIDTH
+        # Shrink only, like fit to width
+        scale = min(1.0, writer.width() / left)
+
+        heights = self._fit_row_heights(column_x, writer)
+        positions = self._paginate(heights, writer.height() / scale)
+
+        def rect_of(first_col: str, last_col: str, row: int, last_row: int) -> QRectF:
+            top = positions[row][1]
+            bottom = positions[last_row][1] + heights[last_row]
+            return QRectF(column_x[first_col][0], top, column_x[last_col][1] - column_x[first_col][0], bottom - top)
+
+        layout = self.invoice_layout
+        items = [(positions[cell.row][0], cell) for cell in layout.cells]
+        items += [(positions[line.row][0], line) for line in layout.lines]
+        if layout.image is not None:
+            items.append((positions[layout.image.row][0], layout.image))
+        items.sort(key=lambda item: item[0])
+
+        painter = QPainter()
+        if not painter.begin(writer):
+            raise OSError(f"Cannot write pdf file: {pdf_path}")
+        try:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.scale(scale, scale)
+            page = 0
+            for item_page, item in items:
+                if item_page != page:
+                    writer.newPage()
+                    page = item_page
+                if item is layout.image:
+                    self._draw_image(painter, item, rect_of)
+                elif isinstance(item, InvoiceCell) and item.text:
+                    rect = rect_of(item.first_col, item.last_col, item.row, item.last_row).adjusted(
+                        CELL_PADDING, CELL_PADDING, -CELL_PADDING, -CELL_PADDING
+                    )
+                    painter.setFont(self._fitted_font(item, rect, writer))
+                    painter.drawText(rect, int(self._alignment(item) | Qt.TextWordWrap), item.text)
+                elif isinstance(item, InvoiceLine):
+                    rect = rect_of(item.first_col, item.last_col, item.row, item.row)
+                    width, style = PENS[item.style]
+                    painter.setPen(QPen(Qt.black, width, style))
+                    y = rect.bottom() if item.bottom else rect.top()
+                    painter.drawLine(QLineF(rect.left(), y, rect.right(), y))
+        finally:
+            painter.end()
+        return pdf_path
+
+    @staticmethod
+    def _draw_image(painter: QPainter, image_cell: InvoiceCell, rect_of) -> None:
+        """ Draw image scaled to fit inside its cell range and centered, like add_image_fit_cell """
+        image = QImage(image_cell.value)
+        if image.isNull():
+            raise FileNotFoundError(f"Cannot load image: {image_cell.value}")
+        area = rect_of(image_cell.first_col, image_cell.last_col, image_cell.row, image_cell.last_row)
+        scale = min(area.width() / image.width(), area.height() / image.height())
+        width, height = image.width() * scale, image.height() * scale
+        target = QRectF(
+            area.left() + (area.width() - width) / 2,
+            area.top() + (area.height() - height) / 2,
+            width,
+            height
+        )
+        painter.drawImage(target, image)
+
+    def build(self, invoice_id: str, invoice_data: list, customer_data: dict, totals: dict = None):
+        """ Build invoice and save it as pdf, return the pdf path """
+        self.layout(invoice_data, customer_data, totals=totals)
+        return self.render_pdf(invoice_id)
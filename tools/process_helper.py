@@ -2,31 +2,323 @@
 
 
 import os
+import time
+import socket
+import threading
 import subprocess
+from contextlib import contextmanager
+
+from pymongo import MongoClient, uri_parser
+from pymongo.errors import PyMongoError, ConnectionFailure
+
+from tools.utils import retry_with_backoff
 
 MONGOD_EXE = os.environ['MONGOD_EXE']
 DB_PATH = os.environ['DB_PATH']
 
-def start_broker():
-    """ Start MongoDB Broker """
-    cmd = f'"{MONGOD_EXE}" --dbpath "{DB_PATH}"'
-    subprocess.Popen(
-        cmd,
-        shell=True,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-
-def stop_broker():
-    """ Stop MongoDB Broker """
-    cmd = 'taskkill /F /IM mongod.exe'
-    subprocess.Popen(
-        cmd,
-        shell=True,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
+PIDFILE_NAME = "invoice_app_mongod.pid"
+LOCKFILE_NAME = "invoice_app_mongod.lock"
+LOGFILE_NAME = "mongod.log"
+STALE_LOCK_SECONDS = 60
+WATCH_INTERVAL = 2.0
+RESTART_INITIAL_DELAY = 1.0
+RESTART_MAX_DELAY = 30.0
+RESTART_MAX_ATTEMPTS = 5
+STOP_TIMEOUT = 10.0
+
+
+def is_port_open(host: str, port: int, timeout: float = 0.5) -> bool:
+    """ Check once whether a TCP connection to host:port succeeds """
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+def wait_for_port(host: str, port: int, deadline: float) -> bool:
+    """ Wait until a TCP connection to host:port succeeds or the monotonic deadline passes """
+    return retry_with_backoff(lambda: is_port_open(host, port), deadline)
+
+def is_pid_alive(pid: int) -> bool:
+    """ Check whether a process with this pid is running """
+    if os.name == 'nt':
+        import ctypes # pylint: disable=import-outside-toplevel
+        process_query_limited_information = 0x1000
+        still_active = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == still_active
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def process_image(pid: int) -> str:
+    """ Executable path of a running process, None if it cannot be read """
+    if os.name == 'nt':
+        import ctypes # pylint: disable=import-outside-toplevel
+        process_query_limited_information = 0x1000
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            return None
+        buffer = ctypes.create_unicode_buffer(1024)
+        size = ctypes.c_ulong(len(buffer))
+        found = kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size))
+        kernel32.CloseHandle(handle)
+        return buffer.value if found else None
+
+    try:
+        # Linux marks the link when the binary was replaced since the process started
+        return os.readlink(f"/proc/{pid}/exe").removesuffix(" (deleted)")
+    except OSError:
+        pass
+    try:
+        # No procfs, e.g. macOS
+        result = subprocess.run(["ps", "-p", str(pid), "-o", "comm="],
+                                capture_output=True, text=True, timeout=2, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+def is_mongod_pid(pid: int) -> bool:
+    """ Check whether pid is a running MONGOD_EXE, a recycled pid of another program is not """
+    if pid is None or not is_pid_alive(pid):
+        return False
+    image = process_image(pid)
+    return image is not None and same_path(os.path.basename(image), os.path.basename(MONGOD_EXE))
+
+def same_path(first: str, second: str) -> bool:
+    """ Compare two file system paths after normalisation """
+    if not first or not second:
+        return False
+    return os.path.normcase(os.path.realpath(first)) == os.path.normcase(os.path.realpath(second))
+
+
+class BrokerSupervisor():
+    """
+    Manage the mongod serving DB_PATH.
+
+    A healthy mongod already listening on the configured port is reused instead of
+    spawning a second one. Instances started by this application are recorded in a
+    pidfile inside DB_PATH, restarted with backoff if they die and shut down cleanly
+    with the `shutdown` admin command. Instances not started by us are never stopped.
+    A running instance is only reused when it serves DB_PATH, and a pidfile only counts
+    when its pid still belongs to a mongod process.
+    """
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.host, self.port = uri_parser.parse_uri(endpoint)['nodelist'][0]
+        self.pidfile = os.path.join(DB_PATH, PIDFILE_NAME)
+        self.lockfile = os.path.join(DB_PATH, LOCKFILE_NAME)
+        self.process: subprocess.Popen = None
+        self.pid: int = None
+        self.owned = False
+        self._stop_event = threading.Event()
+        self._watchdog: threading.Thread = None
+        self.error: str = None
+
+    def start(self, deadline: float = None) -> bool:
+        """
+        Reuse a running mongod or spawn a new one, then watch it.
+        Returns False with the reason in `error` when mongod cannot be started, the port is
+        held by a process that does not answer or the instance on the port serves another
+        database, waiting at most until the deadline.
+        """
+        self._stop_event.clear()
+        self.error = None
+        try:
+            with self._spawn_lock(deadline):
+                recorded_pid = self._read_pidfile()
+                recorded_alive = is_mongod_pid(recorded_pid)
+
+                port_open = is_port_open(self.host, self.port)
+                if port_open and self._ping():
+                    db_path = self._db_path()
+                    if not same_path(db_path, DB_PATH):
+                        self.error = f"mongod on {self.host}:{self.port} serves {db_path}, not {DB_PATH}"
+                        print(f"[ERROR] {self.error}")
+                        return False
+                    # Healthy instance, ours from a previous run if the pidfile says so
+                    self.pid = recorded_pid if recorded_alive else None
+                    self.owned = recorded_alive
+                elif port_open and not recorded_alive:
+                    # A spawned mongod could not bind the port anyway
+                    self.error = f"port {self.host}:{self.port} is in use by an unresponsive process"
+                    print(f"[ERROR] {self.error}")
+                    return False
+                elif not recorded_alive:
+                    self._spawn()
+                else:
+                    # Our mongod is still starting up
+                    self.pid, self.owned = recorded_pid, True
+        except OSError as err:
+            self.error = f"{type(err).__name__}: {err}"
+            print(f"[ERROR] Failed to start mongod: {self.error}")
+            return False
+
+        if self.owned and (self._watchdog is None or not self._watchdog.is_alive()):
+            self._watchdog = threading.Thread(target=self._watch, name="BrokerWatchdog", daemon=True)
+            self._watchdog.start()
+        return True
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> bool:
+        """ Shut down mongod if this application started it, return True once it has exited """
+        self._stop_event.set()
+        if not self.owned:
+            return True
+
+        self._shutdown_command()
+        exited = retry_with_backoff(lambda: not self._is_alive(), time.monotonic() + timeout)
+        if not exited and self.process is not None:
+            # Server ignored shutdown, terminate is still a clean stop for mongod on POSIX
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+                exited = True
+            except subprocess.TimeoutExpired:
+                exited = False
+
+        if exited:
+            self._remove_file(self.pidfile)
+            self.process, self.pid, self.owned = None, None, False
+        return exited
+
+    def _spawn(self) -> None:
+        os.makedirs(DB_PATH, exist_ok=True)
+        self.process = subprocess.Popen( # pylint: disable=consider-using-with
+            [
+                MONGOD_EXE,
+                "--dbpath", DB_PATH,
+                "--port", str(self.port),
+                "--bind_ip", self.host,
+                "--logpath", os.path.join(DB_PATH, LOGFILE_NAME),
+                "--logappend"
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        )
+        self.pid = self.process.pid
+        self.owned = True
+        with open(self.pidfile, mode='w', encoding='utf-8') as pid_file:
+            pid_file.write(str(self.pid))
+
+    def _watch(self) -> None:
+        """ Restart owned mongod with exponential backoff when it dies """
+        attempts = 0
+        delay = RESTART_INITIAL_DELAY
+        while not self._stop_event.wait(WATCH_INTERVAL):
+            if self._is_alive():
+                attempts, delay = 0, RESTART_INITIAL_DELAY
+                continue
+
+            if attempts >= RESTART_MAX_ATTEMPTS:
+                print(f"[ERROR] mongod died and could not be restarted after {attempts} attempts")
+                return
+            if self._stop_event.wait(delay):
+                return
+
+            attempts += 1
+            delay = min(delay * 2, RESTART_MAX_DELAY)
+            print(f"[ERROR] mongod is not running, restarting (attempt {attempts})")
+            try:
+                with self._spawn_lock():
+                    self._spawn()
+            except OSError as err:
+                print(f"[ERROR] Failed to restart mongod: {err}")
+
+    def _is_alive(self) -> bool:
+        if self.process is not None:
+            return self.process.poll() is None
+        return is_mongod_pid(self.pid)
+
+    def _admin_client(self) -> MongoClient:
+        return MongoClient(self.endpoint, directConnection=True, serverSelectionTimeoutMS=1000)
+
+    def _ping(self) -> bool:
+        client = self._admin_client()
+        try:
+            client.admin.command("ping")
+            return True
+        except PyMongoError:
+            return False
+        finally:
+            client.close()
+
+    def _db_path(self) -> str:
+        """ dbPath the running mongod was started with, None if it cannot be read """
+        client = self._admin_client()
+        try:
+            options = client.admin.command("getCmdLineOpts")
+            return options.get('parsed', {}).get('storage', {}).get('dbPath')
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to read mongod command line options: {err}")
+            return None
+        finally:
+            client.close()
+
+    def _shutdown_command(self) -> None:
+        client = self._admin_client()
+        try:
+            client.admin.command("shutdown")
+        except ConnectionFailure:
+            # Server closes the connection while shutting down
+            pass
+        except PyMongoError as err:
+            print(f"[ERROR] Failed to shut down mongod: {err}")
+        finally:
+            client.close()
+
+    def _read_pidfile(self) -> int:
+        try:
+            with open(self.pidfile, mode='r', encoding='utf-8') as pid_file:
+                return int(pid_file.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @contextmanager
+    def _spawn_lock(self, deadline: float = None):
+        """
+        Lockfile guarding start/restart against a second application instance,
+        raises TimeoutError when it is still held at the monotonic deadline
+        """
+        os.makedirs(DB_PATH, exist_ok=True)
+        while True:
+            try:
+                os.close(os.open(self.lockfile, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                if self._is_lock_stale():
+                    self._remove_file(self.lockfile)
+                elif deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"{self.lockfile} is held by another instance") from None
+                else:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            self._remove_file(self.lockfile)
+
+    def _is_lock_stale(self) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self.lockfile) > STALE_LOCK_SECONDS
+        except OSError:
+            return False
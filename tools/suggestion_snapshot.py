@@ -0,0 +1,71 @@
+"""
+Local snapshot of customer and product suggestion data.
+
+Stored as JSON lines: a header line with the format version and the time the data was
+synced from MongoDB, followed by one `[collection, document]` line per suggestion.
+Loading it at startup fills the completers before the database is reachable.
+"""
+import os
+import json
+import threading
+from datetime import datetime
+
+from common.constants import DBCollection
+
+SNAPSHOT_VERSION = 1
+
+
+class SuggestionSnapshot():
+    """ Read and write the suggestion snapshot file, writes can run on a background thread """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> tuple[datetime, list, list]:
+        """ Return (synced_at, customers, products), None if missing, outdated or unreadable """
+        if not os.path.isfile(self.path):
+            return None
+
+        customers, products = [], []
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as snapshot_file:
+                header = json.loads(snapshot_file.readline())
+                if header.get('version') != SNAPSHOT_VERSION:
+                    return None
+                for line in snapshot_file:
+                    collection, doc = json.loads(line)
+                    if collection == DBCollection.CUSTOMER.name:
+                        customers.append(doc)
+                    elif collection == DBCollection.PRODUCT.name:
+                        products.append(doc)
+            synced_at = datetime.fromisoformat(header['synced_at'])
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            print(f"[ERROR] Failed to load suggestion snapshot '{self.path}': {err}")
+            return None
+
+        return synced_at, customers, products
+
+    def save(self, synced_at: datetime, customers: list, products: list) -> None:
+        """ Write snapshot to a temporary file and swap it in, readers never see a partial file """
+        temp_path = f"{self.path}.tmp"
+        try:
+            with self._lock:
+                with open(temp_path, mode='w', encoding='utf-8') as snapshot_file:
+                    header = {'version': SNAPSHOT_VERSION, 'synced_at': synced_at.isoformat()}
+                    snapshot_file.write(json.dumps(header) + '\n')
+                    for collection, docs in ((DBCollection.CUSTOMER, customers), (DBCollection.PRODUCT, products)):
+                        for doc in docs:
+                            snapshot_file.write(
+                                json.dumps([collection.name, doc], ensure_ascii=False, default=str) + '\n'
+                            )
+                os.replace(temp_path, self.path)
+        except OSError as err:
+            print(f"[ERROR] Failed to save suggestion snapshot '{self.path}': {err}")
+
+    def save_in_background(self, synced_at: datetime, customers: list, products: list) -> threading.Thread:
+        """ Save on a worker thread, caller must pass lists it no longer mutates """
+        thread = threading.Thread(
+            target=self.save, args=(synced_at, customers, products), name="SnapshotThread", daemon=True
+        )
+        thread.start()
+        return thread
@@ -2,18 +2,15 @@
 
 import os
 import re
+import time
 import json
 import hashlib
 import unicodedata
 
 from pydotdict import DotDict
-from PIL import Image as PILImage
-from spire.xls import Workbook as SpireWB
 
-from openpyxl.drawing.image import Image
-from openpyxl.drawing.xdr import XDRPositiveSize2D
-from openpyxl.drawing.spreadsheet_drawing import OneCellAnchor, AnchorMarker
-from openpyxl.utils import get_column_letter, column_index_from_string
+# PIL, spire.xls and openpyxl are only needed at export time, they are imported
+# inside the functions using them to keep them out of application startup.
 
 PX_TO_EMU = 9525
 
@@ -31,11 +28,24 @@ def load_json(path: str) -> DotDict:
 
 def save_json(data: dict, path: str) -> None:
     """ Save json file """
+    if isinstance(data, DotDict):
+        # DotDict keeps its items outside of the dict storage json reads
+        data = data.to_dict()
     with open(path, mode='w', encoding='utf-8') as json_file:
         json.dump(data, json_file, indent=4)
 
+def file_hash(path: str) -> str:
+    """ Hash of file content """
+    digest = hashlib.md5()
+    with open(path, mode='rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def export_xlsx_to_pdf(xlsx_path: str, remove_xlsx:bool = False) -> str:
     """ Export xlsx to pdf file"""
+    from spire.xls import Workbook as SpireWB # pylint: disable=import-outside-toplevel
+
     assert os.path.isfile(xlsx_path), f"[ERROR] File not found: {xlsx_path}"
     xlsx_exts = '.' +  xlsx_path.split('.')[-1]
     pdf_path = xlsx_path.replace(xlsx_exts, '.pdf')
@@ -50,6 +60,8 @@ def export_xlsx_to_pdf(xlsx_path: str, remove_xlsx:bool = False) -> str:
 
 def _get_range_pixel_size(ws, start_cell: str, end_cell: str):
     """Get total pixel width/height for a cell range (handles merged cells)."""
+    from openpyxl.utils import get_column_letter, column_index_from_string # pylint: disable=import-outside-toplevel
+
     start_col = ''.join([c for c in start_cell if c.isalpha()])
     start_row = int(''.join([c for c in start_cell if c.isdigit()]))
     end_col = ''.join([c for c in end_cell if c.isalpha()])
@@ -70,6 +82,13 @@ def add_image_fit_cell(ws, path: str, start_cell: str, end_cell: str = None, fit
     Insert an image resized to fit inside a single cell or a merged cell range,
     centered within that area.
     """
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image as PILImage
+    from openpyxl.drawing.image import Image
+    from openpyxl.drawing.xdr import XDRPositiveSize2D
+    from openpyxl.drawing.spreadsheet_drawing import OneCellAnchor, AnchorMarker
+    from openpyxl.utils import column_index_from_string
+
     start_col_letter = ''.join([c for c in start_cell if c.isalpha()])
     start_row_idx = int(''.join([c for c in start_cell if c.isdigit()]))
     if end_cell is None:
@@ -107,10 +126,30 @@ def add_image_fit_cell(ws, path: str, start_cell: str, end_cell: str = None, fit
 
     ws.add_image(img)
 
+def retry_with_backoff(probe, deadline: float, initial_delay: float = 0.05, max_delay: float = 1.0) -> bool:
+    """
+    Call `probe` until it returns True or time.monotonic() passes `deadline`.
+
+    The delay between attempts starts at `initial_delay` and doubles up to `max_delay`.
+    """
+    delay = initial_delay
+    while True:
+        if probe():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
 def clear_format_money(text: str):
     """ Clear format money """
     return text.replace('.', '').replace(',', '').replace('VNĐ', '').replace(' ', '').strip()
 
+def format_money(value: int) -> str:
+    """ Format number with '.' thousand separators, e.g. 1234567 -> 1.234.567 """
+    return f"{value:,}".replace(',', '.')
+
 def encode_product_id(name: str, type_: str, price: str) -> str:
     """ Encode product id """
     text = f"{name}-{type_}-{price}"
@@ -0,0 +1,163 @@
+""" Write-behind queue for MongoDB writes """
+
+
+import time
+import itertools
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from common.constants import DBCollection, WriteStatus
+
+_commit_tokens = itertools.count()
+
+
+class WriteJob():
+    """ One pending write: a single document upsert or a whole invoice commit """
+    def __init__(self, collection_type: DBCollection, data):
+        self.collection_type = collection_type
+        self.data = data
+        self.enqueued_at = time.monotonic()
+        self.token = next(_commit_tokens) if collection_type is None else None
+
+    @property
+    def key(self) -> tuple:
+        """
+        Coalescing key, later jobs with the same key replace earlier ones.
+        Every commit is a separate sale and gets its own key, commits are never coalesced.
+        """
+        if self.collection_type is None:
+            return ("commit", self.data.key, self.token)
+        return (self.collection_type, self.data["_id"])
+
+    def documents(self) -> list[tuple[DBCollection, dict]]:
+        """ Documents carried by this job """
+        if self.collection_type is None:
+            return self.data.documents()
+        return [(self.collection_type, self.data)]
+
+
+class WriteBehindQueue(QObject):
+    """
+    Queue owned by MongoDBClient that performs database writes on a dedicated worker thread.
+
+    Repeated upserts of the same _id that are still pending are coalesced, only the
+    latest document is written. Invoice commits are always written one by one. Results come back through Qt signals so callers on the
+    GUI thread never wait on the database.
+    """
+    write_finished = pyqtSignal(object)
+    write_failed = pyqtSignal(object)
+
+    def __init__(self, mongodb_client):
+        super().__init__()
+        self.mongodb_client = mongodb_client
+        self._pending: OrderedDict[tuple, WriteJob] = OrderedDict()
+        self._in_flight: WriteJob = None
+        # Jobs that failed while stop() waits, returned by it instead of signalled
+        self._unwritten: list[WriteJob] = None
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="WriteBehindThread", daemon=True)
+        self._thread.start()
+
+    def put_document(self, data: dict, collection_type: DBCollection) -> bool:
+        """ Queue an upsert of one document, return False if it can not be queued """
+        if not data.get("_id", None):
+            return False
+        return self._put(WriteJob(collection_type, data))
+
+    def put_commit(self, commit) -> bool:
+        """ Queue an InvoiceCommit, return False if it can not be queued """
+        return self._put(WriteJob(None, commit))
+
+    def _put(self, job: WriteJob) -> bool:
+        with self._condition:
+            if self._stopping:
+                return False
+            previous = self._pending.get(job.key)
+            if previous is not None:
+                # Keep queue position and age of the first pending write
+                job.enqueued_at = previous.enqueued_at
+            self._pending[job.key] = job
+            self._condition.notify()
+        return True
+
+    def depth(self) -> int:
+        """ Number of writes not yet completed, including the one in progress """
+        with self._condition:
+            return len(self._pending) + (1 if self._in_flight else 0)
+
+    def oldest_pending_age(self) -> float:
+        """ Age in seconds of the oldest write not yet completed, 0 when idle """
+        with self._condition:
+            oldest = self._in_flight or next(iter(self._pending.values()), None)
+            if oldest is None:
+                return 0.0
+            return time.monotonic() - oldest.enqueued_at
+
+    def stop(self, timeout: float = None) -> list[WriteJob]:
+        """
+        Stop accepting writes, wait for pending ones and return those that were not written.
+
+        A write already in progress when the timeout passes can not be taken back, commits
+        increment sale counts and must not be replayed once stored. It is waited for up to
+        timeout again and only returned when the worker reports it failed.
+        """
+        with self._condition:
+            self._stopping = True
+            self._unwritten = []
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+        with self._condition:
+            # Not started yet, the worker will not pick them up once pending is empty
+            remaining = list(self._pending.values())
+            self._pending.clear()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._in_flight is not None:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    print(f"[ERROR] Write-behind job {self._in_flight.key} did not finish, "
+                          "it is not kept locally as it may still be written")
+                    break
+                self._condition.wait(left)
+            remaining[:0] = self._unwritten
+            self._unwritten = None
+        return remaining
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                _, self._in_flight = self._pending.popitem(last=False)
+                job = self._in_flight
+
+            written = self._execute(job)
+            with self._condition:
+                self._in_flight = None
+                if not written and self._unwritten is not None:
+                    # stop() is waiting for this outcome and keeps the job locally
+                    self._unwritten.append(job)
+                    job = None
+                self._condition.notify_all()
+
+            if job is None:
+                continue
+            if written:
+                self.write_finished.emit(job)
+            else:
+                self.write_failed.emit(job)
+
+    def _execute(self, job: WriteJob) -> bool:
+        try:
+            if job.collection_type is None:
+                return self.mongodb_client.commit_invoice(job.data).status
+            status = self.mongodb_client.upsert_document(job.data, job.collection_type)
+            return status != WriteStatus.FAILED
+        except Exception as err: # pylint: disable=broad-exception-caught
+            print(f"[ERROR] Write-behind job {job.key} failed: {err}")
+            return False